@@ -0,0 +1,113 @@
+"""
+Encode and decode throughput of the redis_utils codecs against bytes saved.
+
+Every installed serializer is combined with every installed compressor (and
+no compression) on seeded synthetic payloads of three kinds and sizes. Each
+case reports the encoded size and the bytes saved against plain pickle, the
+format `redis_set_df` and `redis_set_dill` store today. Compression runs on
+every payload (threshold 0) so its cost is visible at every size.
+
+use: python benchmarks/bench_codecs.py --output codecs.json
+     python benchmarks/bench_codecs.py --only records --sizes 2
+"""
+import sys
+import random
+import string
+import pickle
+
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from bench_common import base_parser, finish, measure
+
+from redis_utils import redis_codecs
+
+
+def records(rng: random.Random, size: int) -> List[Dict[str, Any]]:
+    cities = ['Bogota', 'Lima', 'Quito', 'Santiago', 'Caracas']
+    return [{'id': i, 'name': ''.join(rng.choices(string.ascii_lowercase,
+                                                  k=8)),
+             'city': rng.choice(cities), 'score': round(rng.random(), 4),
+             'active': rng.random() < 0.5}
+            for i in range(size)]
+
+
+def text(rng: random.Random, size: int) -> str:
+    words = [''.join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 9)))
+             for _ in range(500)]
+    return ' '.join(rng.choice(words) for _ in range(size))
+
+
+def numbers(rng: random.Random, size: int) -> List[float]:
+    return [rng.gauss(0, 1) for _ in range(size)]
+
+
+# payload kind -> (builder, sizes in items)
+PAYLOADS: Dict[str, Tuple[Callable, Sequence[int]]] = {
+    'records': (records, (10, 1000, 50000)),
+    'text': (text, (20, 2000, 100000)),
+    'numbers': (numbers, (10, 1000, 100000)),
+}
+
+
+def print_savings(results: List[Dict]):
+    print(f"\n{'case':<36}{'bytes':>12}{'saved':>8}"
+          f"{'encode MB/s':>13}{'decode MB/s':>13}")
+    encodes = {r['name'][:-len(':encode')]: r for r in results
+               if r['name'].endswith(':encode')}
+    for r in results:
+        if not r['name'].endswith(':decode'):
+            continue
+        e = encodes[r['name'][:-len(':decode')]]
+        print(f"{e['name'][:-len(':encode')] + '[' + str(e['size']) + ']':<36}"
+              f"{e['bytes']:>12,}{e['saved']:>8.0%}"
+              f"{e['mb_per_sec']:>13.1f}{r['mb_per_sec']:>13.1f}")
+
+
+def main() -> int:
+    parser = base_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='0,1,2',
+                        help='comma separated size indexes to run')
+    args = parser.parse_args()
+    only = {n for n in args.only.split(',') if n}
+    unknown = only - set(PAYLOADS)
+    if unknown:
+        parser.error(f'unknown cases: {", ".join(sorted(unknown))}')
+    indexes = [int(i) for i in args.sizes.split(',') if i]
+
+    serializers = [s for s in redis_codecs.available_serializers()
+                   if s != 'raw']
+    compressors = [None] + redis_codecs.available_compressors()
+    results = []
+    for kind, (build, sizes) in PAYLOADS.items():
+        if only and kind not in only:
+            continue
+        for index in indexes:
+            if index >= len(sizes):
+                continue
+            size = sizes[index]
+            value = build(random.Random(f'{args.seed}:{kind}:{size}'), size)
+            baseline = len(pickle.dumps(value))
+            for serializer in serializers:
+                for compressor in compressors:
+                    codec = redis_codecs.Codec(serializer, compressor,
+                                               threshold=0)
+                    name = f'{kind}:{serializer}+{compressor or "none"}'
+                    data = codec.encode(value)
+                    for step, func, arg in (('encode', codec.encode, value),
+                                            ('decode', codec.decode, data)):
+                        record = measure(f'{name}:{step}', size, func,
+                                         [(arg,)] * 10, repeat=args.repeat,
+                                         memory=False)
+                        record['bytes'] = len(data)
+                        record['saved'] = 1 - len(data) / baseline
+                        record['mb_per_sec'] = \
+                            record['ops_per_sec'] * baseline / 1e6
+                        results.append(record)
+                    print(f'done {name}[{size}]', file=sys.stderr)
+    print_savings(results)
+    print()
+    return finish(args, 'codecs', results)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,221 @@
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tracemalloc
+
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def percentile(ordered: Sequence[float], pct: float) -> float:
+    """
+    Returns the nearest-rank percentile of an already sorted sequence
+    :param ordered: The sorted values
+    :param pct: The percentile, between 0 and 100
+    :return: The value at the percentile, 0.0 for an empty sequence
+    """
+    if not ordered:
+        return 0.0
+    index = int(round(pct / 100 * (len(ordered) - 1)))
+    return ordered[min(max(index, 0), len(ordered) - 1)]
+
+
+def summarize(name: str, size: Any, latencies_ns: List[int],
+              peak_bytes: int = 0, **extra: Any) -> Dict[str, Any]:
+    """
+    Builds the result record of one benchmark case
+    :param name: Name of the benchmarked function
+    :param size: Input size of the case
+    :param latencies_ns: Per-call latencies in nanoseconds
+    :param peak_bytes: Peak traced memory of one pass over the inputs
+    :param extra: Additional fields stored in the record
+    :return: A dict with throughput, latency percentiles and memory
+    """
+    ordered = sorted(latencies_ns)
+    total = sum(ordered)
+    record = {'name': name,
+              'size': size,
+              'calls': len(ordered),
+              'ops_per_sec': len(ordered) / (total / 1e9) if total else 0.0,
+              'mean_us': total / len(ordered) / 1e3 if ordered else 0.0,
+              'p50_us': percentile(ordered, 50) / 1e3,
+              'p90_us': percentile(ordered, 90) / 1e3,
+              'p99_us': percentile(ordered, 99) / 1e3,
+              'max_us': ordered[-1] / 1e3 if ordered else 0.0,
+              'peak_kib': peak_bytes / 1024}
+    record.update(extra)
+    return record
+
+
+def measure(name: str, size: Any, func: Callable,
+            inputs: Union[Sequence[tuple], Callable[[], Sequence[tuple]]],
+            repeat: int = 1, warmup: int = 3,
+            memory: bool = True) -> Dict[str, Any]:
+    """
+    Calls `func(*args)` for every args tuple in `inputs`, `repeat`
+    times, timing each call with perf_counter_ns. Peak memory is
+    traced in a separate pass so tracemalloc does not skew timings.
+    :param name: Name of the benchmarked function
+    :param size: Input size of the case
+    :param func: The function to call
+    :param inputs: Argument tuples, one per call, or a function
+        that builds them before every pass (untimed), for
+        functions that mutate their inputs
+    :param repeat: Number of passes over the inputs
+    :param warmup: Untimed calls made before measuring
+    :param memory: If True, measure the peak memory of one pass
+    :return: The result record built by `summarize`
+    """
+    build = inputs if callable(inputs) else lambda: inputs
+    clock = time.perf_counter_ns
+    for args in build()[:warmup]:
+        func(*args)
+    latencies = []
+    append = latencies.append
+    for _ in range(repeat):
+        for args in build():
+            start = clock()
+            func(*args)
+            append(clock() - start)
+    peak = 0
+    if memory:
+        pass_inputs = build()
+        tracemalloc.start()
+        for args in pass_inputs:
+            func(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return summarize(name, size, latencies, peak)
+
+
+def result_key(record: Dict[str, Any]) -> str:
+    return f"{record['name']}[{record['size']}]"
+
+
+def print_results(results: List[Dict[str, Any]]):
+    """
+    Prints the results as an aligned table
+    :param results: The result records
+    """
+    header = (f"{'case':<36}{'ops/s':>14}{'p50 us':>12}"
+              f"{'p90 us':>12}{'p99 us':>12}{'peak KiB':>12}")
+    print(header)
+    print('-' * len(header))
+    for r in results:
+        print(f"{result_key(r):<36}{r['ops_per_sec']:>14,.0f}"
+              f"{r['p50_us']:>12.2f}{r['p90_us']:>12.2f}"
+              f"{r['p99_us']:>12.2f}{r['peak_kib']:>12.1f}")
+
+
+def save_results(path: str, suite: str,
+                 results: List[Dict[str, Any]],
+                 params: Optional[Dict[str, Any]] = None):
+    """
+    Saves the results as JSON along with the run metadata
+    :param path: Output file path
+    :param suite: Name of the benchmark suite
+    :param results: The result records
+    :param params: The parameters the suite ran with
+    """
+    data = {'suite': suite,
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'params': params or {},
+            'results': results}
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+
+
+def compare_results(results: List[Dict[str, Any]], baseline_path: str,
+                    threshold: float = 0.2,
+                    metrics: Sequence[str] = ('p50_us',)
+                    ) -> List[str]:
+    """
+    Compares the results with a saved baseline. A case regresses
+    when a latency metric grows by more than `threshold` (0.2 is
+    20% slower). Cases missing from the baseline are skipped.
+    :param results: The result records
+    :param baseline_path: Path of a JSON file saved by `save_results`
+    :param threshold: Allowed relative slowdown
+    :param metrics: Latency metrics to compare
+    :return: A description of every regression found
+    """
+    with open(baseline_path) as f:
+        baseline = {result_key(r): r for r in json.load(f)['results']}
+    regressions = []
+    for record in results:
+        base = baseline.get(result_key(record))
+        if base is None:
+            continue
+        for metric in metrics:
+            old, new = base.get(metric), record.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if change > threshold:
+                regressions.append(
+                    f'{result_key(record)} {metric}: {old:.2f} -> '
+                    f'{new:.2f} (+{change:.0%})')
+    return regressions
+
+
+def base_parser(description: str) -> argparse.ArgumentParser:
+    """
+    Returns an argument parser with the options shared by the suites
+    :param description: Description of the suite
+    :return: The argument parser
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--seed', type=int, default=0,
+                        help='seed of the synthetic data')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='passes over the inputs of each case')
+    parser.add_argument('--only', default='',
+                        help='comma separated case names to run')
+    parser.add_argument('--output', help='save the results as JSON')
+    parser.add_argument('--baseline',
+                        help='JSON results to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='allowed relative slowdown, 0.2 = 20%%')
+    parser.add_argument('--metrics', default='p50_us',
+                        help='comma separated metrics to compare')
+    return parser
+
+
+def finish(args: argparse.Namespace, suite: str,
+           results: List[Dict[str, Any]]) -> int:
+    """
+    Prints, saves and compares the results as requested
+    by the command line arguments
+    :param args: The parsed arguments of `base_parser`
+    :param suite: Name of the benchmark suite
+    :param results: The result records
+    :return: The process exit code, 1 if there are regressions
+    """
+    print_results(results)
+    if args.output:
+        save_results(args.output, suite, results, {
+            k: v for k, v in vars(args).items()
+            if k not in ('output', 'baseline')})
+        print(f'\nresults saved to {args.output}')
+    if args.baseline:
+        regressions = compare_results(
+            results, args.baseline, args.threshold,
+            [m for m in args.metrics.split(',') if m])
+        if regressions:
+            print(f'\n{len(regressions)} regression(s) over '
+                  f'{args.threshold:.0%}:')
+            for line in regressions:
+                print(f'  {line}')
+            return 1
+        print(f'\nno regressions over {args.threshold:.0%} '
+              f'against {args.baseline}')
+    return 0
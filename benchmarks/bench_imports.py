@@ -0,0 +1,157 @@
+"""
+Import-time benchmark for the packages in this repository.
+
+Runs each import statement in a fresh interpreter with `python -X importtime`
+and sums the cumulative time of every module it imported. For each package it
+compares the lazy `import pkg` with the first-use `from pkg import name` and the
+eager `import pkg.pkg`. With --ref the eager imports are also timed on another
+git revision (e.g. the commit before the lazy imports) to show the savings.
+
+use: python benchmarks/bench_imports.py --repeat 10
+     python benchmarks/bench_imports.py --ref HEAD~1 --output imports.json
+"""
+import os
+import sys
+import tarfile
+import tempfile
+import subprocess
+
+from typing import Dict, List, Optional, Set, Tuple
+
+from bench_common import ROOT, base_parser, finish, summarize
+
+# package -> a function used to time the first-use import
+PACKAGES = {
+    'ip_utils': 'my_ip',
+    'redis_utils': 'redis_get',
+    'regex_utils': 'is_valid_email',
+    'selenium_utils': 'getDriver',
+    'slack_utils': 'send_message',
+    'utils': 'levenshtein',
+}
+
+
+def parse_importtime(stderr: str) -> Dict[str, int]:
+    """
+    Returns the cumulative microseconds of every top-level
+    import reported by `python -X importtime`
+    :param stderr: The stderr of the interpreter
+    :return: A dict of module name -> cumulative microseconds
+    """
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # nested imports are indented below their importer
+        if name.startswith('  '):
+            continue
+        modules[name.strip()] = int(cumulative)
+    return modules
+
+
+def run_import(statement: str, cwd: str) -> Tuple[Dict[str, int], str]:
+    """
+    Runs an import statement in a fresh interpreter
+    :param statement: The Python statement to run
+    :param cwd: Directory put on PYTHONPATH and used as cwd
+    :return: The top-level imports with their cumulative
+        microseconds and the error message if the statement failed
+    """
+    env = dict(os.environ, PYTHONPATH=cwd)
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        cwd=cwd, env=env, capture_output=True, text=True)
+    error = ''
+    if proc.returncode:
+        error = proc.stderr.strip().splitlines()[-1]
+    return parse_importtime(proc.stderr), error
+
+
+def time_statement(label: str, mode: str, statement: str, cwd: str,
+                   startup: Set[str], repeat: int) -> Dict:
+    """
+    Times an import statement `repeat` times, counting only the
+    modules that the interpreter does not import at startup
+    :return: The result record built by `summarize`
+    """
+    # one untimed run fills the bytecode cache
+    run_import(statement, cwd)
+    latencies, modules, error = [], 0, ''
+    for _ in range(repeat):
+        imported, error = run_import(statement, cwd)
+        if error:
+            break
+        new = {k: v for k, v in imported.items() if k not in startup}
+        latencies.append(sum(new.values()) * 1000)
+        modules = len(new)
+    return summarize(label, mode, latencies, statement=statement,
+                     top_level_modules=modules, error=error)
+
+
+def export_ref(ref: str, target: str) -> str:
+    """
+    Extracts a git revision of the repository into a directory
+    :param ref: The git revision
+    :param target: The directory to extract into
+    :return: The directory with the extracted tree
+    """
+    archive = os.path.join(target, 'tree.tar')
+    subprocess.run(['git', 'archive', '--format=tar', '-o', archive, ref],
+                   cwd=ROOT, check=True)
+    with tarfile.open(archive) as tar:
+        tar.extractall(os.path.join(target, 'tree'))
+    return os.path.join(target, 'tree')
+
+
+def print_savings(results: List[Dict]):
+    print(f"\n{'package':<18}{'mode':<14}{'p50 ms':>10}{'modules':>9}  note")
+    for r in results:
+        note = r['error'] or ''
+        p50 = '-' if r['error'] else f"{r['p50_us'] / 1e3:.1f}"
+        print(f"{r['name']:<18}{r['size']:<14}{p50:>10}"
+              f"{r['top_level_modules']:>9}  {note}")
+
+
+def main() -> int:
+    parser = base_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument('--ref', help='git revision to also time the '
+                                      'eager imports on, e.g. HEAD~1')
+    args = parser.parse_args()
+    only = {n for n in args.only.split(',') if n} or set(PACKAGES)
+
+    trees: List[Tuple[str, str]] = [('', ROOT)]
+    tmp: Optional[tempfile.TemporaryDirectory] = None
+    if args.ref:
+        tmp = tempfile.TemporaryDirectory()
+        trees.append((args.ref, export_ref(args.ref, tmp.name)))
+
+    results = []
+    try:
+        for ref, cwd in trees:
+            startup = set(run_import('pass', cwd)[0])
+            for package, name in PACKAGES.items():
+                if package not in only:
+                    continue
+                if ref:
+                    modes = [(f'eager@{ref}', f'import {package}.{package}')]
+                else:
+                    modes = [('lazy', f'import {package}'),
+                             ('first_use', f'from {package} import {name}'),
+                             ('eager', f'import {package}.{package}')]
+                for mode, statement in modes:
+                    results.append(time_statement(
+                        package, mode, statement, cwd, startup, args.repeat))
+                    print(f'done {package} {mode}', file=sys.stderr)
+    finally:
+        if tmp is not None:
+            tmp.cleanup()
+
+    print_savings(results)
+    print()
+    return finish(args, 'imports',
+                  [r for r in results if not r['error']])
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,176 @@
+"""
+Sync vs asyncio throughput of the redis_utils helpers at high concurrency.
+
+Every case runs the same number of operations with `size` of them in flight
+at once, using three paths:
+  sync      redis_utils helpers called from a pool of `size` threads
+  executor  the sync helpers wrapped in run_in_executor from asyncio
+  async     the async_redis_utils coroutines run with redis_gather
+ops_per_sec is the wall-clock throughput of the whole batch, the latency
+percentiles are per operation.
+
+use: python benchmarks/bench_redis_async.py --url redis://localhost:6379/15
+     python benchmarks/bench_redis_async.py --fake --concurrency 1,10,100
+"""
+import sys
+import time
+import asyncio
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+from bench_common import base_parser, finish, summarize
+
+from redis_utils import redis_utils, async_redis_utils
+
+PREFIX = 'bench:async:'
+
+
+def configure(args, connections: int):
+    """
+    Points both modules at the benchmark server, with pools large
+    enough for `connections` concurrent operations
+    """
+    import redis.asyncio
+    if args.fake:
+        # in-process server, measures client overhead only
+        import fakeredis
+        server = getattr(configure, 'server', None) or fakeredis.FakeServer()
+        configure.server = server
+        redis_utils.redis_configure(store=redis_utils.RedisStore(
+            pool=redis.ConnectionPool(
+                connection_class=fakeredis.FakeConnection, server=server)))
+        async_redis_utils.redis_configure(client=redis.asyncio.Redis(
+            connection_pool=redis.asyncio.ConnectionPool(
+                connection_class=fakeredis.FakeAsyncConnection,
+                server=server)))
+        return
+    redis_utils.redis_configure(url=args.url, max_connections=connections)
+    async_redis_utils.redis_configure(url=args.url,
+                                      max_connections=connections)
+
+
+# name -> (sync call, async call), both take the operation index
+OPERATIONS: Dict[str, Tuple[Callable, Callable[[int], Awaitable]]] = {
+    'get': (lambda i: redis_utils.redis_get(f'{PREFIX}{i % 1000}'),
+            lambda i: async_redis_utils.redis_get(f'{PREFIX}{i % 1000}')),
+    'set': (lambda i: redis_utils.redis_set(f'{PREFIX}{i % 1000}', 'x' * 64),
+            lambda i: async_redis_utils.redis_set(f'{PREFIX}{i % 1000}',
+                                                  'x' * 64)),
+    'incr': (lambda i: redis_utils.redis_incr(f'{PREFIX}counter'),
+             lambda i: async_redis_utils.redis_incr(f'{PREFIX}counter')),
+}
+
+
+def timed(func: Callable, i: int, latencies: List[int]):
+    start = time.perf_counter_ns()
+    func(i)
+    latencies.append(time.perf_counter_ns() - start)
+
+
+async def timed_async(func: Callable[[int], Awaitable], i: int,
+                      latencies: List[int]):
+    start = time.perf_counter_ns()
+    await func(i)
+    latencies.append(time.perf_counter_ns() - start)
+
+
+def run_sync(func: Callable, ops: int, concurrency: int
+             ) -> Tuple[float, List[int]]:
+    latencies = []
+    with ThreadPoolExecutor(concurrency) as pool:
+        start = time.perf_counter()
+        list(pool.map(lambda i: timed(func, i, latencies), range(ops)))
+        return time.perf_counter() - start, latencies
+
+
+async def run_executor(func: Callable, ops: int, concurrency: int
+                       ) -> Tuple[float, List[int]]:
+    loop = asyncio.get_running_loop()
+    latencies = []
+    with ThreadPoolExecutor(concurrency) as pool:
+        async def call(i):
+            start = time.perf_counter_ns()
+            await loop.run_in_executor(pool, func, i)
+            latencies.append(time.perf_counter_ns() - start)
+        start = time.perf_counter()
+        await async_redis_utils.redis_gather(
+            *(call(i) for i in range(ops)), limit=concurrency)
+        return time.perf_counter() - start, latencies
+
+
+async def run_async(func: Callable[[int], Awaitable], ops: int,
+                    concurrency: int) -> Tuple[float, List[int]]:
+    latencies = []
+    start = time.perf_counter()
+    await async_redis_utils.redis_gather(
+        *(timed_async(func, i, latencies) for i in range(ops)),
+        limit=concurrency)
+    return time.perf_counter() - start, latencies
+
+
+def bench(args, name: str, concurrency: int) -> List[Dict]:
+    sync_func, async_func = OPERATIONS[name]
+    configure(args, concurrency)
+    # warm up the pools and fill the keys read by `get`
+    redis_utils.redis_set_many({f'{PREFIX}{i}': 'x' * 64
+                                for i in range(1000)})
+    run_sync(sync_func, concurrency, concurrency)
+
+    async def run_async_paths():
+        # the async pool is bound to this event loop
+        configure(args, concurrency)
+        await run_async(async_func, concurrency, concurrency)
+        return (await run_executor(sync_func, args.ops, concurrency),
+                await run_async(async_func, args.ops, concurrency))
+
+    results = []
+    best: Dict[str, Tuple[float, List[int]]] = {}
+    for _ in range(args.repeat):
+        runs = {'sync': run_sync(sync_func, args.ops, concurrency)}
+        runs['executor'], runs['async'] = asyncio.run(run_async_paths())
+        for mode, run in runs.items():
+            if mode not in best or run[0] < best[mode][0]:
+                best[mode] = run
+    for mode, (wall, latencies) in best.items():
+        results.append(summarize(f'{name}:{mode}', concurrency, latencies,
+                                 ops_per_sec=args.ops / wall,
+                                 wall_ms=wall * 1e3))
+    return results
+
+
+def main() -> int:
+    parser = base_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', default='redis://localhost:6379/15',
+                        help='server to benchmark, its keys under '
+                             f'{PREFIX} are overwritten')
+    parser.add_argument('--fake', action='store_true',
+                        help='use an in-process fakeredis server')
+    parser.add_argument('--concurrency', default='1,10,100,1000',
+                        help='comma separated operations in flight')
+    parser.add_argument('--ops', type=int, default=5000,
+                        help='operations per run')
+    parser.set_defaults(repeat=3)
+    args = parser.parse_args()
+
+    only = {n for n in args.only.split(',') if n}
+    unknown = only - set(OPERATIONS)
+    if unknown:
+        parser.error(f'unknown cases: {", ".join(sorted(unknown))}')
+
+    results = []
+    try:
+        for name in OPERATIONS:
+            if only and name not in only:
+                continue
+            for concurrency in (int(c) for c in args.concurrency.split(',')
+                                if c):
+                results.extend(bench(args, name, concurrency))
+                print(f'done {name}[{concurrency}]', file=sys.stderr)
+    finally:
+        redis_utils.redis_delete_keys(f'{PREFIX}*')
+    return finish(args, 'redis_async', results)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,403 @@
+"""
+Throughput, latency and round trips per call of the redis_utils helpers.
+
+Every helper runs at several value sizes and concurrency levels (threads
+sharing the module client). The server is a redis-server started for the run
+on a free port, an existing server given with --url, or an in-process
+fakeredis server with --fake or when no redis-server binary is found.
+With --shards N, N servers are started and the keys spread across them.
+ops_per_sec is the wall-clock throughput of the whole batch, round_trips the
+mean number of network round trips per call counted by the CountingRedis
+client of the module. Helpers that do not take a value only run at the
+first size.
+
+use: python benchmarks/bench_redis_utils.py --sizes 64,65536 --concurrency 1,16
+     python benchmarks/bench_redis_utils.py --url redis://localhost:6379/15
+     python benchmarks/bench_redis_utils.py --only get,set --histograms
+     python benchmarks/bench_redis_utils.py --shards 4 --concurrency 32
+"""
+import os
+import sys
+import time
+import shutil
+import socket
+import subprocess
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Tuple
+
+from bench_common import base_parser, finish, summarize
+
+from redis_utils import redis_utils
+
+PREFIX = 'bench:utils:'
+# keys each case cycles through
+KEYS = 1000
+
+
+def start_server(binary: str) -> Tuple[subprocess.Popen, str]:
+    """
+    Starts a throwaway redis-server without persistence on a free
+    port and waits until it answers
+    """
+    with socket.socket() as sock:
+        sock.bind(('localhost', 0))
+        port = sock.getsockname()[1]
+    process = subprocess.Popen(
+        [binary, '--port', str(port), '--save', '', '--appendonly', 'no'],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f'redis://localhost:{port}/0'
+    deadline = time.monotonic() + 10
+    while True:
+        try:
+            redis_utils.redis_configure(url=url)
+            redis_utils.redis_client.ping()
+            return process, url
+        except redis_utils.redis.exceptions.ConnectionError:
+            if process.poll() is not None or time.monotonic() > deadline:
+                process.kill()
+                raise RuntimeError(f'{binary} did not start')
+            time.sleep(0.05)
+
+
+def configure(args) -> List[subprocess.Popen]:
+    """
+    Points redis_utils at the benchmark server, or servers
+    :return: The server processes started for the run
+    """
+    binary = None if args.fake or args.url else \
+        args.server or shutil.which('redis-server')
+    if binary:
+        processes, urls = [], []
+        for _ in range(args.shards):
+            process, url = start_server(binary)
+            processes.append(process)
+            urls.append(url)
+        print(f'started {binary} at {", ".join(urls)}', file=sys.stderr)
+        if args.shards > 1:
+            redis_utils.redis_configure(shards=urls)
+        return processes
+    if args.shards > 1:
+        raise SystemExit('--shards needs a redis-server binary')
+    if args.url:
+        redis_utils.redis_configure(url=args.url)
+        return []
+    # in-process server, measures client overhead only
+    import redis
+    import fakeredis
+    print('using fakeredis', file=sys.stderr)
+    redis_utils.redis_configure(store=redis_utils.RedisStore(
+        pool=redis.ConnectionPool(connection_class=fakeredis.FakeConnection,
+                                  server=fakeredis.FakeServer())))
+    return []
+
+
+def key(name: str, i: int) -> str:
+    return f'{PREFIX}{name}:{i % KEYS}'
+
+
+def fill(name: str, value: str):
+    redis_utils.redis_set_many({key(name, i): value for i in range(KEYS)})
+
+
+# name -> (takes a value, function of the value that prepares the
+# keys and returns the call, a function of the operation index)
+CASES: Dict[str, Tuple[bool, Callable[[str], Callable[[int], Any]]]] = {}
+
+
+def case(name: str, sized: bool = True) -> Callable:
+    def register(setup: Callable[[str], Callable[[int], Any]]) -> Callable:
+        CASES[name] = (sized, setup)
+        return setup
+    return register
+
+
+@case('set')
+def set_(value: str):
+    return lambda i: redis_utils.redis_set(key('set', i), value)
+
+
+@case('set_nx')
+def set_nx(value: str):
+    fill('set_nx', value)
+    return lambda i: redis_utils.redis_set(key('set_nx', i), value, False)
+
+
+@case('get')
+def get(value: str):
+    fill('get', value)
+    return lambda i: redis_utils.redis_get(key('get', i))
+
+
+@case('ttl', sized=False)
+def ttl(value: str):
+    fill('ttl', value)
+    return lambda i: redis_utils.redis_ttl(key('ttl', i))
+
+
+@case('delete')
+def delete(value: str):
+    # the set is part of the timed call
+    def call(i: int):
+        redis_utils.redis_set(key('delete', i), value)
+        redis_utils.redis_delete(key('delete', i))
+    return call
+
+
+@case('cache_check')
+def cache_check(value: str):
+    return lambda i: redis_utils.cache_redis_with_key_check(
+        key('cache_check', i), value, 60_000)
+
+
+@case('set_dill')
+def set_dill(value: str):
+    return lambda i: redis_utils.redis_set_dill(key('set_dill', i), value)
+
+
+@case('get_dill')
+def get_dill(value: str):
+    for i in range(KEYS):
+        redis_utils.redis_set_dill(key('get_dill', i), value)
+    return lambda i: redis_utils.redis_get_dill(key('get_dill', i))
+
+
+@case('set_df')
+def set_df(value: str):
+    return lambda i: redis_utils.redis_set_df(key('set_df', i), value)
+
+
+@case('get_df')
+def get_df(value: str):
+    for i in range(KEYS):
+        redis_utils.redis_set_df(key('get_df', i), value)
+    return lambda i: redis_utils.redis_get_df(key('get_df', i))
+
+
+@case('set_encoded')
+def set_encoded(value: str):
+    return lambda i: redis_utils.redis_set_encoded(key('set_encoded', i),
+                                                   value)
+
+
+@case('get_encoded')
+def get_encoded(value: str):
+    redis_utils.redis_set_encoded_many({key('get_encoded', i): value
+                                        for i in range(KEYS)})
+    return lambda i: redis_utils.redis_get_encoded(key('get_encoded', i))
+
+
+@case('set_chunked')
+def set_chunked(value: str):
+    return lambda i: redis_utils.redis_set_chunked(
+        key('set_chunked', i), value, chunk_size=64 * 1024)
+
+
+@case('get_chunked')
+def get_chunked(value: str):
+    for i in range(KEYS):
+        redis_utils.redis_set_chunked(key('get_chunked', i), value,
+                                      chunk_size=64 * 1024)
+    return lambda i: redis_utils.redis_get_chunked(key('get_chunked', i))
+
+
+@case('set_many')
+def set_many(value: str):
+    # 100 keys per call
+    return lambda i: redis_utils.redis_set_many(
+        {key('set_many', i * 100 + j): value for j in range(100)})
+
+
+@case('get_many')
+def get_many(value: str):
+    fill('get_many', value)
+    return lambda i: redis_utils.redis_get_many(
+        [key('get_many', i * 100 + j) for j in range(100)])
+
+
+@case('incr', sized=False)
+def incr(value: str):
+    return lambda i: redis_utils.redis_incr(key('incr', i), days=1)
+
+
+@case('incr_ttl', sized=False)
+def incr_ttl(value: str):
+    return lambda i: redis_utils.redis_incr_ttl(key('incr_ttl', i), ttl=60)
+
+
+@case('incr_capped', sized=False)
+def incr_capped(value: str):
+    return lambda i: redis_utils.redis_incr_capped(key('incr_capped', i),
+                                                   maximum=10 ** 9)
+
+
+@case('counter_buffer', sized=False)
+def counter_buffer(value: str):
+    # flushed by the buffer's thread, round trips are amortized
+    buffer = redis_utils.RedisCounterBuffer(interval=0.1)
+    return lambda i: buffer.incr(key('counter_buffer', i))
+
+
+@case('rate_limit_fixed', sized=False)
+def rate_limit_fixed(value: str):
+    return lambda i: redis_utils.redis_rate_limit_fixed(
+        key('rate_limit_fixed', i), 10 ** 9, 60)
+
+
+@case('rate_limit_sliding', sized=False)
+def rate_limit_sliding(value: str):
+    return lambda i: redis_utils.redis_rate_limit_sliding(
+        key('rate_limit_sliding', i), 100, 1)
+
+
+@case('rename', sized=False)
+def rename(value: str):
+    # the set is part of the timed call
+    def call(i: int):
+        redis_utils.redis_set(key('rename', i), value)
+        redis_utils.redis_rename(key('rename', i), key('rename', i) + ':b',
+                                 overwrite=True)
+    return call
+
+
+@case('cached')
+def cached(value: str):
+    @redis_utils.redis_cached(ttl=3600, prefix=f'{PREFIX}cached')
+    def load(i: int) -> str:
+        return value
+    return lambda i: load(i % KEYS)
+
+
+@case('bloom_add_many', sized=False)
+def bloom_add_many(value: str):
+    # 1000 items per call
+    bloom = redis_utils.RedisBloomFilter(f'{PREFIX}bloom_add', 10 ** 7)
+    return lambda i: bloom.add_many(f'{i}:{j}' for j in range(1000))
+
+
+@case('bloom_contains_many', sized=False)
+def bloom_contains_many(value: str):
+    bloom = redis_utils.RedisBloomFilter(f'{PREFIX}bloom_contains', 10 ** 6)
+    bloom.add_many(str(j) for j in range(KEYS))
+    return lambda i: bloom.contains_many(str(i * 1000 + j)
+                                         for j in range(1000))
+
+
+def run(call: Callable[[int], Any], ops: int, concurrency: int
+        ) -> Tuple[float, List[int]]:
+    latencies = []
+
+    def timed(i: int):
+        start = time.perf_counter_ns()
+        call(i)
+        latencies.append(time.perf_counter_ns() - start)
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        start = time.perf_counter()
+        list(pool.map(timed, range(ops)))
+        return time.perf_counter() - start, latencies
+
+
+def bench(args, name: str, size: int, concurrency: int) -> Dict[str, Any]:
+    # random text, redis_get decodes values as UTF-8
+    value = os.urandom(size // 2 + 1).hex()[:size]
+    call = CASES[name][1](value)
+    run(call, concurrency, concurrency)
+    best = None
+    round_trips = 0
+    for _ in range(args.repeat):
+        redis_utils.redis_store.reset_round_trips()
+        wall, latencies = run(call, args.ops, concurrency)
+        round_trips = redis_utils.redis_store.reset_round_trips()
+        if best is None or wall < best[0]:
+            best = wall, latencies
+    wall, latencies = best
+    return summarize(f'{name}:c{concurrency}', size, latencies,
+                     ops_per_sec=args.ops / wall, wall_ms=wall * 1e3,
+                     round_trips=round_trips / args.ops)
+
+
+def print_round_trips(results: List[Dict]):
+    print(f"\n{'case':<36}{'round trips/call':>18}")
+    seen = set()
+    for r in results:
+        name = r['name'].rsplit(':c', 1)[0]
+        if name not in seen:
+            seen.add(name)
+            print(f"{name:<36}{r['round_trips']:>18.2f}")
+
+
+def print_histograms(stats: Dict[str, Dict[str, Any]]):
+    print(f"\n{'command':<20}{'calls':>10}{'mean ms':>10}"
+          f"{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for command, s in sorted(stats.items()):
+        print(f"{command:<20}{s['calls']:>10,}{s['mean_ms']:>10.3f}"
+              f"{s['p50_ms']:>10.3f}{s['p99_ms']:>10.3f}"
+              f"{s['max_ms']:>10.3f}")
+
+
+def main() -> int:
+    parser = base_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', help='existing server to benchmark, its '
+                                      f'keys under {PREFIX} are overwritten')
+    parser.add_argument('--server',
+                        help='redis-server binary, found in PATH by default')
+    parser.add_argument('--fake', action='store_true',
+                        help='use an in-process fakeredis server')
+    parser.add_argument('--shards', type=int, default=1,
+                        help='servers to start and spread the keys across')
+    parser.add_argument('--sizes', default='64,4096,262144',
+                        help='comma separated value sizes in bytes')
+    parser.add_argument('--concurrency', default='1,8,32',
+                        help='comma separated number of threads')
+    parser.add_argument('--ops', type=int, default=2000,
+                        help='operations per run')
+    parser.add_argument('--histograms', action='store_true',
+                        help='record and print per-command latency '
+                             'histograms')
+    parser.set_defaults(repeat=3)
+    args = parser.parse_args()
+
+    only = {n for n in args.only.split(',') if n}
+    unknown = only - set(CASES)
+    if unknown:
+        parser.error(f'unknown cases: {", ".join(sorted(unknown))}')
+    sizes = [int(s) for s in args.sizes.split(',') if s]
+    levels = [int(c) for c in args.concurrency.split(',') if c]
+
+    processes = configure(args)
+    if args.histograms:
+        redis_utils.redis_enable_latency_histograms()
+    results = []
+    try:
+        for name, (sized, _) in CASES.items():
+            if only and name not in only:
+                continue
+            for size in sizes if sized else sizes[:1]:
+                for concurrency in levels:
+                    try:
+                        results.append(bench(args, name, size, concurrency))
+                    except ImportError as e:
+                        # dill or another optional dependency is missing
+                        print(f'skipped {name}: {e}', file=sys.stderr)
+                        break
+                    print(f'done {name}[{size}] c{concurrency}',
+                          file=sys.stderr)
+                else:
+                    continue
+                break
+    finally:
+        if not processes:
+            redis_utils.redis_delete_keys(f'{PREFIX}*')
+        for process in processes:
+            process.terminate()
+            process.wait()
+    print_round_trips(results)
+    if args.histograms:
+        print_histograms(redis_utils.redis_latency_stats())
+    print()
+    return finish(args, 'redis_utils', results)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
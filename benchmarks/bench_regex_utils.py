@@ -0,0 +1,133 @@
+"""
+Benchmarks for the validators and the classifier in regex_utils.regex_utils.
+
+Every case runs on seeded batches of synthetic fields (emails, URLs,
+IPs, dates, phones, numbers and free text) at several batch sizes and
+reports throughput, latency percentiles and peak memory. The
+`validators` case is the baseline: one validator after another on
+every value, as the pipelines did before `classify`.
+
+use: python benchmarks/bench_regex_utils.py --output results.json
+     python benchmarks/bench_regex_utils.py --only validators,classify_many
+"""
+import sys
+import random
+import string
+
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from bench_common import base_parser, finish, measure
+
+from regex_utils import regex_utils
+
+# type -> validators of the type, what `classify` replaces
+VALIDATORS = {
+    'email': (regex_utils.is_valid_email,),
+    'url': (regex_utils.is_valid_url,),
+    'ip': (regex_utils.is_valid_ipv4, regex_utils.is_valid_ipv6),
+    'date': (regex_utils.is_valid_date, regex_utils.is_valid_datetime),
+    'time': (regex_utils.is_valid_time,),
+    'phone': (regex_utils.is_valid_phone_number_e164,),
+    'number': (regex_utils.is_numeric,),
+}
+
+
+def word(rng: random.Random, low: int = 3, high: int = 10) -> str:
+    return ''.join(rng.choice(string.ascii_lowercase)
+                   for _ in range(rng.randint(low, high)))
+
+
+def field(rng: random.Random) -> str:
+    kind = rng.randrange(9)
+    if kind == 0:
+        return f'{word(rng)}.{word(rng)}@{word(rng)}.com'
+    if kind == 1:
+        return f'https://{word(rng)}.org/{word(rng)}'
+    if kind == 2:
+        return '.'.join(str(rng.randint(0, 255)) for _ in range(4))
+    if kind == 3:
+        return ':'.join(f'{rng.randint(0, 0xffff):x}' for _ in range(8))
+    if kind == 4:
+        return (f'{rng.randint(1970, 2030)}-{rng.randint(1, 12):02}-'
+                f'{rng.randint(1, 28):02}')
+    if kind == 5:
+        return f'+{rng.randint(1, 9)}{rng.randint(10 ** 9, 10 ** 10)}'
+    if kind == 6:
+        return f'{rng.uniform(-1e6, 1e6):.2f}'
+    return ' '.join(word(rng) for _ in range(rng.randint(1, 4)))
+
+
+def fields(rng: random.Random, size: int) -> List[str]:
+    return [field(rng) for _ in range(size)]
+
+
+def validators(values: List[str]) -> List[set]:
+    return [{t for t, funcs in VALIDATORS.items()
+             if any(func(value) for func in funcs)} for value in values]
+
+
+def classify(values: List[str]) -> List[set]:
+    return [regex_utils.classify(value) for value in values]
+
+
+def validate_emails(values: List[str]) -> List[bool]:
+    return [regex_utils.is_valid_email(value) for value in values]
+
+
+def validate_many_emails(values: List[str]) -> List[bool]:
+    return regex_utils.validate_many('email', values)
+
+
+def batch_inputs(rng, size):
+    return [(fields(rng, size),) for _ in range(5)]
+
+
+# name -> (function, batch sizes, input builder)
+CASES: Dict[str, Tuple[Callable, Sequence[int], Callable]] = {
+    'validators': (validators, (100, 1000, 10000), batch_inputs),
+    'classify': (classify, (100, 1000, 10000), batch_inputs),
+    'classify_many': (regex_utils.classify_many, (100, 1000, 10000),
+                      batch_inputs),
+    'is_valid_email': (validate_emails, (100, 1000, 10000), batch_inputs),
+    'validate_many': (validate_many_emails, (100, 1000, 10000),
+                      batch_inputs),
+}
+
+
+def main() -> int:
+    parser = base_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='0,1,2',
+                        help='comma separated size indexes to run, '
+                             'e.g. 0 for the smallest batches only')
+    parser.add_argument('--list', action='store_true',
+                        help='list the cases and exit')
+    args = parser.parse_args()
+
+    if args.list:
+        for name, (_, sizes, _) in CASES.items():
+            print(f'{name:<20}{sizes}')
+        return 0
+
+    only = {n for n in args.only.split(',') if n}
+    unknown = only - set(CASES)
+    if unknown:
+        parser.error(f'unknown cases: {", ".join(sorted(unknown))}')
+    indexes = [int(i) for i in args.sizes.split(',') if i]
+
+    results = []
+    for name, (func, sizes, build) in CASES.items():
+        if only and name not in only:
+            continue
+        for index in indexes:
+            if index >= len(sizes):
+                continue
+            size = sizes[index]
+            rng = random.Random(f'{args.seed}:{size}')
+            results.append(measure(name, size, func, build(rng, size),
+                                   repeat=args.repeat))
+            print(f'done {name}[{size}]', file=sys.stderr)
+    return finish(args, 'regex_utils', results)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,202 @@
+"""
+Benchmarks for the string, math and trie helpers in utils.utils.
+
+Every case runs on seeded synthetic data at several input sizes and
+reports throughput, latency percentiles and peak memory.
+
+use: python benchmarks/bench_utils.py --output results.json
+     python benchmarks/bench_utils.py --baseline results.json --threshold 0.2
+"""
+import sys
+import random
+import string
+
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from bench_common import base_parser, finish, measure
+
+from utils import utils
+
+LETTERS = string.ascii_lowercase
+
+
+def random_word(rng: random.Random, length: int,
+                alphabet: str = LETTERS) -> str:
+    return ''.join(rng.choice(alphabet) for _ in range(length))
+
+
+def vocabulary(rng: random.Random, size: int) -> List[str]:
+    return [random_word(rng, rng.randint(3, 10)) for _ in range(size)]
+
+
+def typo(rng: random.Random, word: str) -> str:
+    i = rng.randrange(len(word))
+    return word[:i] + rng.choice(LETTERS) + word[i + 1:]
+
+
+def levenshtein_inputs(rng, size):
+    # the recursive implementation is exponential, keep sizes small
+    return [(random_word(rng, size, 'abcd'), random_word(rng, size, 'abcd'))
+            for _ in range(20)]
+
+
+def category_mapper_inputs(rng, size):
+    master = vocabulary(rng, size)
+    to_map = [typo(rng, rng.choice(master)) for _ in range(20)]
+    return [(master, to_map)] * 5
+
+
+def word_replacer_inputs(rng, size):
+    words = vocabulary(rng, size)
+    data = {w: w.upper() for w in words}
+    return [(' '.join(rng.choice(words) for _ in range(30)), data)
+            for _ in range(5)]
+
+
+def find_rank_inputs(rng, size):
+    return [(random_word(rng, size),) for _ in range(50)]
+
+
+def powerset_inputs(rng, size):
+    return [(list(range(size)),)] * 3
+
+
+def numbers_to_words_inputs(rng, size):
+    return [(str(rng.randint(10 ** (size - 1), 10 ** size - 1)),)
+            for _ in range(100)]
+
+
+def safe_cast_inputs(rng, size):
+    alphabet = string.digits * 4 + LETTERS + '.,-$ '
+    return [(random_word(rng, size, alphabet),) for _ in range(200)]
+
+
+def make_trie_inputs(rng, size):
+    return [tuple(vocabulary(rng, size))] * 3
+
+
+def trie_lookup_inputs(rng, size):
+    words = vocabulary(rng, size)
+    trie = {}
+    for word in words:
+        utils.insert_trie(trie, word)
+    probes = [rng.choice(words) if rng.random() < 0.5
+              else random_word(rng, rng.randint(3, 10))
+              for _ in range(200)]
+    return trie, words, probes
+
+
+def in_trie_bool_inputs(rng, size):
+    trie, _, probes = trie_lookup_inputs(rng, size)
+    return [(trie, p) for p in probes]
+
+
+def trie_starts_with_inputs(rng, size):
+    trie, _, probes = trie_lookup_inputs(rng, size)
+    return [(trie, p[:3]) for p in probes]
+
+
+def insert_trie_inputs(rng, size):
+    words = vocabulary(rng, size)
+
+    def build():
+        trie = {}
+        return [(trie, w) for w in words]
+    return build
+
+
+def remove_trie_inputs(rng, size):
+    words = vocabulary(rng, size)
+
+    def build():
+        trie = {}
+        for word in words:
+            utils.insert_trie(trie, word)
+        return [(trie, w) for w in words]
+    return build
+
+
+def count_words_trie_inputs(rng, size):
+    trie, _, probes = trie_lookup_inputs(rng, size)
+    return [(trie, '')] * 3 + [(trie, p[:2]) for p in probes[:20]]
+
+
+def get_trie_words_inputs(rng, size):
+    trie, _, _ = trie_lookup_inputs(rng, size)
+    return [(trie,)] * 3
+
+
+def autocomplete_trie_inputs(rng, size):
+    trie, _, probes = trie_lookup_inputs(rng, size)
+    return [(trie, p[:2]) for p in probes[:50]]
+
+
+# name -> (function, input sizes, input builder)
+CASES: Dict[str, Tuple[Callable, Sequence[int], Callable]] = {
+    'levenshtein': (utils.levenshtein, (4, 6, 8), levenshtein_inputs),
+    'category_mapper': (utils.category_mapper, (10, 100, 1000),
+                        category_mapper_inputs),
+    'word_replacer': (utils.word_replacer, (10, 100, 500),
+                      word_replacer_inputs),
+    'find_rank': (utils.find_rank, (8, 32, 128), find_rank_inputs),
+    'powerset': (utils.powerset, (8, 12, 16), powerset_inputs),
+    'numbers_to_words': (utils.numbers_to_words, (3, 12, 36),
+                         numbers_to_words_inputs),
+    'int_safe_cast': (utils.int_safe_cast, (8, 64, 512), safe_cast_inputs),
+    'float_safe_cast': (utils.float_safe_cast, (8, 64, 512),
+                        safe_cast_inputs),
+    'make_trie': (utils.make_trie, (100, 1000, 10000), make_trie_inputs),
+    'insert_trie': (utils.insert_trie, (100, 1000, 10000),
+                    insert_trie_inputs),
+    'in_trie_bool': (utils.in_trie_bool, (100, 1000, 10000),
+                     in_trie_bool_inputs),
+    'trie_starts_with': (utils.trie_starts_with, (100, 1000, 10000),
+                         trie_starts_with_inputs),
+    'count_words_trie': (utils.count_words_trie, (100, 1000, 10000),
+                         count_words_trie_inputs),
+    'remove_trie': (utils.remove_trie, (100, 1000, 10000),
+                    remove_trie_inputs),
+    'get_trie_words': (utils.get_trie_words, (100, 1000, 10000),
+                       get_trie_words_inputs),
+    'autocomplete_trie': (utils.autocomplete_trie, (100, 1000, 10000),
+                          autocomplete_trie_inputs),
+}
+
+
+def main() -> int:
+    parser = base_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='0,1,2',
+                        help='comma separated size indexes to run, '
+                             'e.g. 0 for the smallest inputs only')
+    parser.add_argument('--list', action='store_true',
+                        help='list the cases and exit')
+    args = parser.parse_args()
+
+    if args.list:
+        for name, (_, sizes, _) in CASES.items():
+            print(f'{name:<20}{sizes}')
+        return 0
+
+    only = {n for n in args.only.split(',') if n}
+    unknown = only - set(CASES)
+    if unknown:
+        parser.error(f'unknown cases: {", ".join(sorted(unknown))}')
+    indexes = [int(i) for i in args.sizes.split(',') if i]
+
+    results = []
+    for name, (func, sizes, build) in CASES.items():
+        if only and name not in only:
+            continue
+        for index in indexes:
+            if index >= len(sizes):
+                continue
+            size = sizes[index]
+            rng = random.Random(f'{args.seed}:{name}:{size}')
+            results.append(measure(name, size, func, build(rng, size),
+                                   repeat=args.repeat))
+            print(f'done {name}[{size}]', file=sys.stderr)
+    return finish(args, 'utils', results)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
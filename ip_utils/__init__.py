@@ -0,0 +1,34 @@
+"""
+A module to check the current ip and get a free proxy for small requests.
+
+The functions are loaded lazily on first access (PEP 562), so importing
+the package does not import `ip_utils.ip_utils` or its dependencies until one
+of them is used.
+"""
+import importlib
+
+_SUBMODULES = {
+    'ip_utils': (
+        'my_ip', 'useful_proxies_gen',
+    ),
+}
+_LAZY = {name: module for module, names in _SUBMODULES.items()
+         for name in names}
+
+__all__ = list(_LAZY)
+
+
+def __getattr__(name: str):
+    if name in _SUBMODULES:
+        return importlib.import_module(f'{__name__}.{name}')
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(
+            f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(f'{__name__}.{module}'), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY) | set(_SUBMODULES))
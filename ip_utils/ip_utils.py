@@ -1,11 +1,10 @@
-import os
 import re
-import sys
-import requests
 import traceback
 
-from typing import Iterator, Union, Dict, List
-from bs4 import BeautifulSoup
+from typing import Iterator, Union, Dict, List, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import requests
 
 
 def my_ip(proxies: dict = None) -> Union[str, None]:
@@ -23,6 +22,7 @@ def my_ip(proxies: dict = None) -> Union[str, None]:
         or None in case of errors.
     :rtype: Union[str, None]
     """
+    import requests
     try:
         url = 'http://icanhazip.com'
         r = requests.get(url=url, proxies=proxies)
@@ -57,6 +57,9 @@ def useful_proxies_gen(type_: str='dict') -> Iterator[
     Union[str, Dict[str, str]]: A proxy in the format
     specified by the type_ parameter.
     """
+    import requests
+    from bs4 import BeautifulSoup
+
     def get_free_proxies() -> List[str]:
         """
         A helper function that scrapes a website for free proxies.
@@ -73,7 +76,7 @@ def useful_proxies_gen(type_: str='dict') -> Iterator[
         proxies = [i for i in ip if ip and not i.startswith('0')]
         return proxies
     
-    def get_session(proxies: str) -> requests.Session:
+    def get_session(proxies: str) -> 'requests.Session':
         """
         A helper function that creates a requests session
         with a specific proxy.
@@ -104,8 +107,3 @@ def useful_proxies_gen(type_: str='dict') -> Iterator[
         except Exception:
             continue
 
-
-file_name = os.path.splitext(os.path.basename(os.path.abspath(__file__)))[0]
-dir_name = os.path.basename(os.path.dirname(os.path.abspath(__file__)))
-if __name__ == "__main__" or __name__ == f"{dir_name}.{file_name}":
-    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
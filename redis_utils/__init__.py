@@ -0,0 +1,79 @@
+"""
+A module with Redis functions to store and retrieve values and objects.
+
+The functions are loaded lazily on first access (PEP 562), so importing
+the package does not import `redis_utils.redis_utils` or its dependencies until one
+of them is used.
+"""
+import importlib
+
+_SUBMODULES = {
+    'redis_utils': (
+        'redis_set', 'redis_get', 'redis_ttl', 'redis_set_dill',
+        'redis_get_dill', 'redis_set_df', 'redis_get_df',
+        'cache_redis_with_key_check', 'redis_delete', 'redis_incr',
+        'redis_decr', 'redis_perxpire', 'redis_get_keys',
+        'redis_scan_keys', 'redis_delete_keys', 'redis_rename',
+        'redis_set_many', 'redis_get_many', 'redis_set_dill_many',
+        'redis_get_dill_many', 'redis_delete_many', 'redis_ttl_many',
+        'redis_migrate_keys', 'LatencyHistograms', 'CountingRedis',
+        'CountingPipeline', 'RedisStore', 'RateLimit',
+        'redis_incr_ttl', 'redis_incr_capped',
+        'redis_rate_limit_fixed', 'redis_rate_limit_sliding',
+        'RedisRateLimiter', 'RedisCounterBuffer', 'redis_trie_insert',
+        'redis_trie_incr_score', 'redis_trie_contains',
+        'redis_trie_starts_with', 'redis_trie_count',
+        'redis_trie_remove', 'redis_autocomplete',
+        'redis_set_df_columnar', 'redis_df_columnar_info',
+        'redis_iter_df_columnar', 'redis_get_df_columnar',
+        'redis_set_encoded', 'redis_get_encoded',
+        'redis_set_encoded_many', 'redis_get_encoded_many',
+        'redis_set_chunked', 'redis_get_chunked', 'redis_iter_chunked',
+        'redis_chunked_info', 'redis_delete_chunked',
+        'redis_set_record', 'redis_get_record', 'redis_update_record',
+        'redis_incr_record', 'redis_delete_record_fields',
+        'redis_set_records', 'redis_get_records', 'RedisBloomFilter',
+        'redis_cached', 'redis_enable_near_cache',
+        'redis_disable_near_cache', 'redis_near_cache_stats',
+        'redis_enable_latency_histograms',
+        'redis_disable_latency_histograms', 'redis_latency_stats',
+        'redis_configure',
+    ),
+    'redis_codecs': (
+        'register_serializer', 'register_compressor',
+        'available_serializers', 'available_compressors', 'Codec',
+        'is_encoded', 'decode',
+    ),
+    'redis_near_cache': (
+        'NearCache',
+    ),
+    'redis_queue': (
+        'Job', 'JobFailed', 'RedisQueue',
+    ),
+    'redis_sharding': (
+        'HashRing', 'ShardedRedis', 'ShardedPipeline',
+    ),
+    # the coroutines share the sync names, use
+    # `from redis_utils import async_redis_utils`
+    'async_redis_utils': (),
+}
+_LAZY = {name: module for module, names in _SUBMODULES.items()
+         for name in names}
+
+__all__ = list(_LAZY)
+
+
+def __getattr__(name: str):
+    if name in _SUBMODULES:
+        return importlib.import_module(f'{__name__}.{name}')
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(
+            f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(f'{__name__}.{module}'), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY) | set(_SUBMODULES))
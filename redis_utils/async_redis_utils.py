@@ -0,0 +1,406 @@
+import os
+import uuid
+import pickle
+import asyncio
+
+import redis.asyncio
+
+from typing import (Union, Optional, Any, List, Dict, Iterable,
+                    AsyncIterator, Awaitable, Callable)
+
+from .redis_utils import (_chunks, _ttl_seconds, _chunked_manifest,
+                          _chunk_names, _deleted_value)
+
+# An asyncio mirror of redis_utils. Every helper is a coroutine with the
+# same name and arguments as its sync counterpart and sends one atomic
+# command, like RedisStore. All of them share one connection pool.
+
+
+def redis_configure(host: str = 'localhost', port: int = 6379,
+                    db: int = 0, max_connections: Optional[int] = 100,
+                    url: Optional[str] = None, timeout: float = 20,
+                    client: Optional[redis.asyncio.Redis] = None,
+                    **kwargs) -> redis.asyncio.Redis:
+    """
+    Points the async helpers at a Redis server. The pool blocks
+    (up to `timeout` seconds) when all `max_connections` are busy,
+    so thousands of concurrent coroutines can share it.
+    Connections belong to the event loop that opened them, call it
+    again if the helpers are used from a new event loop.
+    :param host: Redis host
+    :param port: Redis port
+    :param db: Redis database number
+    :param max_connections: Maximum connections in the pool
+    :param url: A redis:// URL, overrides host, port and db
+    :param timeout: Seconds to wait for a free connection
+    :param client: An existing asyncio client to use as is
+    :param kwargs: Other arguments of the connection pool
+    :return: The client used by the async helpers
+    """
+    global redis_client
+    if client is None:
+        if url:
+            pool = redis.asyncio.BlockingConnectionPool.from_url(
+                url, max_connections=max_connections, timeout=timeout,
+                **kwargs)
+        else:
+            pool = redis.asyncio.BlockingConnectionPool(
+                host=host, port=port, db=db, timeout=timeout,
+                max_connections=max_connections, **kwargs)
+        client = redis.asyncio.Redis(connection_pool=pool)
+    redis_client = client
+    return client
+
+
+async def redis_set(key: str, value: str,
+                    replace: Optional[bool] = True,
+                    days: Optional[int] = None) -> bool:
+    """
+    Set the value of the key, see `redis_utils.redis_set`.
+    One SET command with NX and EX.
+    :param key: Key of the value to be stored
+    :param value: Value to be stored
+    :param replace: If False, do not overwrite an existing key
+    :param days: Expiration time in days,
+      if None it will never expire
+    :return: True if the value was set,
+      False if the key already exists and `replace` is False
+    """
+    return bool(await redis_client.set(
+        key, value, ex=_ttl_seconds(days, key), nx=not replace))
+
+
+async def redis_get(key: str) -> Union[str, None]:
+    """
+    Get the value of the key, see `redis_utils.redis_get`.
+    :param key: Key of the value to be retrieved
+    :return: The value, None if the key does not exist
+    """
+    value = await redis_client.get(key)
+    return value.decode('utf-8') if value is not None else None
+
+
+async def redis_ttl(key: str) -> int:
+    """
+    Get the remaining time to live in seconds,
+    see `redis_utils.redis_ttl`.
+    :param key: Key of the value
+    :return: The time to live, -1 if the key does not exist
+      or has no expiration
+    """
+    ttl = await redis_client.ttl(key)
+    return -1 if ttl == -2 else ttl
+
+
+async def redis_set_dill(key: str, df: Any,
+                         replace: Optional[bool] = True,
+                         days: Optional[int] = None) -> bool:
+    """
+    Store a Python object using dill serialization,
+    see `redis_utils.redis_set_dill`.
+    :param key: Key of the object to be stored
+    :param df: Object to be stored
+    :param replace: If False, do not overwrite an existing key
+    :param days: Expiration time in days,
+      if None it will never expire
+    :return: True if the object was stored
+    """
+    import dill
+    return await redis_set(key, dill.dumps(df), replace, days)
+
+
+async def redis_get_dill(key: str) -> Union[object, None]:
+    """
+    Retrieve a Python object stored using dill serialization,
+    see `redis_utils.redis_get_dill`.
+    :param key: Key of the object to be retrieved
+    :return: The object, None if the key does not exist
+    """
+    import dill
+    value = await redis_client.get(key)
+    return dill.loads(value) if value is not None else None
+
+
+async def redis_set_df(key: str, df: Any,
+                       replace: Optional[bool] = True,
+                       days: Optional[int] = None) -> bool:
+    """
+    Store a pickled dataframe, see `redis_utils.redis_set_df`.
+    :param key: Key to store the dataframe under
+    :param df: Data to be stored
+    :param replace: If False, do not overwrite an existing key
+    :param days: Expiration time in days,
+      if None it will never expire
+    :return: True if the data was stored
+    """
+    return await redis_set(key, pickle.dumps(df), replace, days)
+
+
+async def redis_get_df(key: str) -> Optional[Any]:
+    """
+    Retrieve a pickled dataframe, see `redis_utils.redis_get_df`.
+    :param key: Key to retrieve the dataframe from
+    :return: The dataframe, None if the key does not exist
+    """
+    value = await redis_client.get(key)
+    return pickle.loads(value) if value is not None else None
+
+
+async def cache_redis_with_key_check(key: str, value: str,
+                                     millis: int) -> str:
+    """
+    Caches a value with a key, if the key already exists a new
+    key is generated by appending a UUID4,
+    see `redis_utils.cache_redis_with_key_check`.
+    :param key: Key of the value to be stored
+    :param value: Value to be stored
+    :param millis: Expiration time in milliseconds
+    :return: Key used to store the value
+    """
+    if await redis_client.set(key, value, px=millis, nx=True):
+        return key
+    new_key = f"{key}:{str(uuid.uuid4())}"
+    await redis_client.set(new_key, value, px=millis)
+    return new_key
+
+
+async def redis_delete(key: str) -> Union[str, bytes, None]:
+    """
+    Deletes a key and returns its value with GETDEL (Redis 6.2+),
+    see `redis_utils.redis_delete`. The parts of a chunked value
+    are deleted with it.
+    :param key: Key of the value to be deleted
+    :return: The value of the deleted key, as stored (bytes) when
+        it is not UTF-8 text, None if it did not exist
+    """
+    value = await redis_client.getdel(key)
+    manifest = _chunked_manifest(value)
+    if manifest is not None:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for part in _chunks(_chunk_names(key, manifest), 100):
+                pipe.unlink(*part)
+            await pipe.execute()
+    return _deleted_value(value)
+
+
+async def redis_incr(key: str, amount: int = 1,
+                     replace: Optional[bool] = True,
+                     days: Optional[int] = None) -> bool:
+    """
+    Increments the value of a key, see `redis_utils.redis_incr`.
+    With `replace` False the key is created with SET NX EX,
+    otherwise INCRBY and EXPIRE go in one MULTI/EXEC round trip.
+    :param key: Key of the value to be incremented
+    :param amount: Amount to increment the value
+    :param replace: If False, return False if the key exists
+    :param days: Expiration time in days,
+      if None it will never expire
+    :return: True if the value was set,
+      False if the key already exists and `replace` is False
+    """
+    if not replace:
+        return await redis_set(key, amount, False, days)
+    if not days:
+        await redis_client.incrby(key, amount)
+        return True
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.incrby(key, amount)
+        pipe.expire(key, 60 * 60 * 24 * days)
+        await pipe.execute()
+    return True
+
+
+async def redis_decr(key: str, amount: int = 1,
+                     replace: Optional[bool] = True,
+                     days: Optional[int] = None) -> bool:
+    """
+    Decrements the value of a key, see `redis_utils.redis_decr`.
+    :param key: Key of the value to be decremented
+    :param amount: Amount to decrement the value
+    :param replace: If False, return False if the key exists
+    :param days: Expiration time in days,
+      if None it will never expire
+    :return: True if the value was set,
+      False if the key already exists and `replace` is False
+    """
+    return await redis_incr(key, -amount, replace, days)
+
+
+async def redis_perxpire(key: str, timestamp: Union[int, None] = None,
+                         persist: bool = False) -> bool:
+    """
+    Set or remove the expiration of a key,
+    see `redis_utils.redis_perxpire`.
+    :param key: The key to set the TTL for
+    :param timestamp: The Unix timestamp for the TTL
+    :param persist: If True, remove the TTL
+    :return: True if the TTL was set or removed,
+        False if the key does not exist
+    """
+    if persist:
+        return bool(await redis_client.persist(key))
+    if timestamp is not None:
+        return bool(await redis_client.expireat(key, timestamp))
+    return False
+
+
+async def redis_scan_keys(pattern: Optional[str] = None,
+                          count: int = 1000,
+                          type_: Optional[str] = None
+                          ) -> AsyncIterator[str]:
+    """
+    Lazily iterate over the keys that match a pattern with SCAN,
+    see `redis_utils.redis_scan_keys`.
+    :param pattern: Pattern for matching keys, None for all keys
+    :param count: Keys the server walks per call
+    :param type_: Only return keys of this type
+    :return: An async generator of key names
+    """
+    async for key in redis_client.scan_iter(match=pattern, count=count,
+                                            _type=type_):
+        yield key.decode()
+
+
+async def redis_get_keys(pattern: str = None,
+                         delete_keys: bool = False) -> List[str]:
+    """
+    Get a list of keys that match a pattern with SCAN, optionally
+    unlinking them, see `redis_utils.redis_get_keys`.
+    :param pattern: Pattern for matching keys, None for all keys
+    :param delete_keys: Whether to delete the keys found
+    :return: List of key strings
+    """
+    keys = list(dict.fromkeys([k async for k in redis_scan_keys(pattern)]))
+    if delete_keys and keys:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for part in _chunks(keys, 100):
+                pipe.unlink(*part)
+            await pipe.execute()
+    return keys
+
+
+async def redis_rename(key: str, new_key: str, overwrite: bool = False,
+                       delete_old: bool = False) -> List[bool]:
+    """
+    Rename a key with RENAME, or RENAMENX when not overwriting,
+    see `redis_utils.redis_rename` and `RedisStore.rename`.
+    :param key: The existing key to rename
+    :param new_key: The new name for the key
+    :param overwrite: If True, overwrite the new key if it exists
+    :param delete_old: If True, delete the old key when the
+        rename did not move it
+    :return: [renamed, deleted]
+    """
+    try:
+        if overwrite:
+            renamed = bool(await redis_client.rename(key, new_key))
+        else:
+            renamed = bool(await redis_client.renamenx(key, new_key))
+    except redis.exceptions.ResponseError:
+        renamed = False
+    deleted = False
+    if delete_old and not renamed:
+        deleted = bool(await redis_client.delete(key))
+    return [renamed, deleted]
+
+
+async def redis_set_many(mapping: Dict[str, Any],
+                         replace: Optional[bool] = True,
+                         days: Union[int, Dict[str, int], None] = None,
+                         serializer: Optional[Callable[[Any], Any]] = None,
+                         chunk_size: int = 1000) -> List[bool]:
+    """
+    Set many keys, one MSET or pipeline per chunk,
+    see `redis_utils.redis_set_many`.
+    :param mapping: Keys and the values to store
+    :param replace: If False, keys that already exist are not
+      overwritten
+    :param days: Expiration time in days for every key, or a dict
+      with the days of each key, None never expires
+    :param serializer: Function applied to each value before storing it
+    :param chunk_size: Keys sent per round trip
+    :return: True for every key that was set, in input order
+    """
+    result = []
+    for chunk in _chunks(mapping.items(), chunk_size):
+        if serializer is not None:
+            chunk = [(k, serializer(v)) for k, v in chunk]
+        if replace and not days:
+            await redis_client.mset(dict(chunk))
+            result.extend([True] * len(chunk))
+            continue
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for k, v in chunk:
+                pipe.set(k, v, ex=_ttl_seconds(days, k), nx=not replace)
+            result.extend(bool(r) for r in await pipe.execute())
+    return result
+
+
+async def redis_get_many(keys: Iterable[str],
+                         deserializer: Optional[
+                             Callable[[bytes], Any]] = None,
+                         chunk_size: int = 1000) -> List[Any]:
+    """
+    Get many keys with one MGET per chunk,
+    see `redis_utils.redis_get_many`.
+    :param keys: Keys of the values to be retrieved
+    :param deserializer: Function applied to each stored value,
+      values are decoded as utf-8 when None
+    :param chunk_size: Keys sent per round trip
+    :return: The values in input order, None for missing keys
+    """
+    loads = deserializer or (lambda v: v.decode('utf-8'))
+    result = []
+    for chunk in _chunks(keys, chunk_size):
+        result.extend(loads(v) if v is not None else None
+                      for v in await redis_client.mget(chunk))
+    return result
+
+
+async def redis_gather(*aws: Awaitable, limit: Optional[int] = None,
+                       return_exceptions: bool = False) -> List[Any]:
+    """
+    Runs many helper calls concurrently, like asyncio.gather, with
+    at most `limit` of them in flight. Concurrent commands share
+    the pool, so N calls cost about N / max_connections round trip
+    latencies instead of N.
+
+    use: await redis_gather(*(redis_get(k) for k in keys), limit=200)
+
+    :param aws: Coroutines or awaitables to run
+    :param limit: Maximum concurrent calls, None for no limit
+    :param return_exceptions: Return exceptions as results instead
+      of raising the first one
+    :return: The results in input order
+    """
+    if limit is None:
+        return await asyncio.gather(*aws,
+                                    return_exceptions=return_exceptions)
+    semaphore = asyncio.Semaphore(limit)
+
+    async def bounded(aw: Awaitable) -> Any:
+        async with semaphore:
+            return await aw
+    return await asyncio.gather(*(bounded(aw) for aw in aws),
+                                return_exceptions=return_exceptions)
+
+
+def redis_pipeline(transaction: bool = False) -> 'redis.asyncio.client.Pipeline':
+    """
+    Returns a pipeline on the shared pool to batch any commands in
+    one round trip.
+
+    use: async with redis_pipeline() as pipe:
+             pipe.get('a').incr('b')
+             a, b = await pipe.execute()
+
+    :param transaction: If True, wrap the commands in MULTI/EXEC
+    :return: The pipeline
+    """
+    return redis_client.pipeline(transaction=transaction)
+
+
+# the defaults can be overridden with REDIS_URL or REDIS_HOST/REDIS_PORT
+redis_configure(host=os.environ.get('REDIS_HOST', 'localhost'),
+                port=int(os.environ.get('REDIS_PORT', 6379)),
+                url=os.environ.get('REDIS_URL'))
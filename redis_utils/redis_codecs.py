@@ -0,0 +1,272 @@
+"""
+Pluggable serializers and compressors for values stored in Redis.
+
+Every encoded value starts with a 4 byte header: the magic bytes b'\\xffR',
+the id of the serializer and the id of the compressor. `decode` reads the
+header, so values written by any codec are read back with the right
+decoders.
+"""
+import json
+import pickle
+import importlib
+
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+MAGIC = b'\xffR'
+
+
+class _Entry(NamedTuple):
+    id: int
+    encode: Callable
+    decode: Callable
+    module: Optional[str]
+
+
+_SERIALIZERS: Dict[str, _Entry] = {}
+_COMPRESSORS: Dict[str, _Entry] = {}
+
+
+def _register(registry: Dict[str, _Entry], name: str, id_: int,
+              encode: Callable, decode: Callable,
+              module: Optional[str]):
+    if not 0 <= id_ <= 255:
+        raise ValueError(f'id must be between 0 and 255, got {id_}')
+    for other, entry in registry.items():
+        if entry.id == id_ and other != name:
+            raise ValueError(f'id {id_} is already used by {other!r}')
+    registry[name] = _Entry(id_, encode, decode, module)
+
+
+def register_serializer(name: str, id_: int,
+                        dumps: Callable[[Any], bytes],
+                        loads: Callable[[bytes], Any],
+                        module: Optional[str] = None):
+    """
+    Registers a serializer for `Codec`. The id is stored in
+    the header of every value, so it must never change.
+    :param name: Name used in `Codec(serializer=name)`
+    :param id_: Unique id between 0 and 255, 0 to 31 are reserved
+    :param dumps: Function that turns an object into bytes
+    :param loads: Function that turns the bytes back into the object
+    :param module: Module `dumps` and `loads` need, checked by
+      `available_serializers`
+    """
+    _register(_SERIALIZERS, name, id_, dumps, loads, module)
+
+
+def register_compressor(name: str, id_: int,
+                        compress: Callable[[bytes, Optional[int]], bytes],
+                        decompress: Callable[[bytes], bytes],
+                        module: Optional[str] = None):
+    """
+    Registers a compressor for `Codec`. The id is stored in
+    the header of every value, so it must never change.
+    :param name: Name used in `Codec(compressor=name)`
+    :param id_: Unique id between 1 and 255, 1 to 31 are reserved
+    :param compress: Function of the data and the compression level
+      (None for the default level) that returns the compressed data
+    :param decompress: Function that returns the original data
+    :param module: Module the functions need, checked by
+      `available_compressors`
+    """
+    if id_ == 0:
+        raise ValueError('id 0 marks uncompressed values')
+    _register(_COMPRESSORS, name, id_, compress, decompress, module)
+
+
+def _installed(entry: _Entry) -> bool:
+    if entry.module is None:
+        return True
+    try:
+        importlib.import_module(entry.module)
+    except ImportError:
+        return False
+    return True
+
+
+def available_serializers() -> List[str]:
+    """
+    :return: The names of the serializers whose module is installed
+    """
+    return [n for n, e in _SERIALIZERS.items() if _installed(e)]
+
+
+def available_compressors() -> List[str]:
+    """
+    :return: The names of the compressors whose module is installed
+    """
+    return [n for n, e in _COMPRESSORS.items() if _installed(e)]
+
+
+def _dill():
+    import dill
+    return dill
+
+
+def _msgpack():
+    import msgpack
+    return msgpack
+
+
+def _lz4():
+    import lz4.frame
+    return lz4.frame
+
+
+def _level(level: Optional[int], default: int) -> int:
+    return default if level is None else level
+
+
+def _raw(value: Any) -> bytes:
+    if isinstance(value, str):
+        raise TypeError("the 'raw' serializer stores bytes, "
+                        "encode str values first")
+    return bytes(value)
+
+
+register_serializer('raw', 0, _raw, bytes)
+register_serializer(
+    'pickle', 1,
+    lambda obj: pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL),
+    pickle.loads)
+register_serializer('dill', 2, lambda obj: _dill().dumps(obj),
+                    lambda data: _dill().loads(data), 'dill')
+register_serializer(
+    'json', 3,
+    lambda obj: json.dumps(obj, separators=(',', ':')).encode('utf-8'),
+    lambda data: json.loads(str(data, 'utf-8')))
+register_serializer('msgpack', 4,
+                    lambda obj: _msgpack().packb(obj, use_bin_type=True),
+                    lambda data: _msgpack().unpackb(data, raw=False),
+                    'msgpack')
+
+
+def _zlib_compress(data: bytes, level: Optional[int]) -> bytes:
+    import zlib
+    return zlib.compress(data, _level(level, 6))
+
+
+def _zlib_decompress(data: bytes) -> bytes:
+    import zlib
+    return zlib.decompress(data)
+
+
+def _lzma_compress(data: bytes, level: Optional[int]) -> bytes:
+    import lzma
+    return lzma.compress(data, preset=_level(level, 6))
+
+
+def _lzma_decompress(data: bytes) -> bytes:
+    import lzma
+    return lzma.decompress(data)
+
+
+register_compressor('zlib', 1, _zlib_compress, _zlib_decompress)
+register_compressor('lzma', 2, _lzma_compress, _lzma_decompress)
+register_compressor(
+    'lz4', 3,
+    lambda data, level: _lz4().compress(
+        data, compression_level=_level(level, 0)),
+    lambda data: _lz4().decompress(data), 'lz4')
+
+
+class Codec:
+    """
+    Encodes values as a header, naming the serializer and the
+    compressor, followed by the payload. Payloads smaller than
+    `threshold` bytes, or that do not shrink, are stored
+    uncompressed.
+
+    use: codec = Codec('msgpack', 'lz4', threshold=512)
+         data = codec.encode({'a': 1})
+         decode(data)
+
+    :param serializer: 'pickle', 'dill', 'json', 'msgpack', 'raw'
+      (bytes as they are) or any registered serializer
+    :param compressor: 'zlib', 'lzma', 'lz4', any registered
+      compressor or None to never compress
+    :param threshold: Minimum serialized size in bytes to compress
+    :param level: Compression level, None for the default of the
+      compressor
+    """
+
+    def __init__(self, serializer: str = 'pickle',
+                 compressor: Optional[str] = 'zlib',
+                 threshold: int = 1024, level: Optional[int] = None):
+        for name, registry, kind in ((serializer, _SERIALIZERS,
+                                      'serializer'),
+                                     (compressor, _COMPRESSORS,
+                                      'compressor')):
+            if name is None and kind == 'compressor':
+                continue
+            entry = registry.get(name)
+            if entry is None:
+                raise ValueError(f'unknown {kind} {name!r}, choose one of '
+                                 f'{", ".join(registry)}')
+            if not _installed(entry):
+                raise ImportError(f'the {name!r} {kind} needs the '
+                                  f'{entry.module!r} package')
+        self.serializer = serializer
+        self.compressor = compressor
+        self.threshold = threshold
+        self.level = level
+        self._serializer = _SERIALIZERS[serializer]
+        self._compressor = _COMPRESSORS.get(compressor)
+
+    def __repr__(self) -> str:
+        return (f'Codec({self.serializer!r}, {self.compressor!r}, '
+                f'threshold={self.threshold}, level={self.level})')
+
+    def encode(self, value: Any) -> bytes:
+        """
+        :param value: The value to encode
+        :return: The header followed by the payload
+        """
+        payload = self._serializer.encode(value)
+        compressor_id = 0
+        if self._compressor is not None and len(payload) >= self.threshold:
+            compressed = self._compressor.encode(payload, self.level)
+            if len(compressed) < len(payload):
+                payload, compressor_id = compressed, self._compressor.id
+        return MAGIC + bytes((self._serializer.id, compressor_id)) + payload
+
+    def decode(self, data: bytes) -> Any:
+        """
+        Decodes a value written by any codec, see `decode`
+        """
+        return decode(data)
+
+
+def _by_id(registry: Dict[str, _Entry], id_: int, kind: str) -> _Entry:
+    for entry in registry.values():
+        if entry.id == id_:
+            return entry
+    raise ValueError(f'unknown {kind} id {id_}, register it first')
+
+
+def is_encoded(data: bytes) -> bool:
+    """
+    :param data: A stored value
+    :return: True if the value starts with a codec header
+    """
+    return len(data) >= 4 and data[:2] == MAGIC
+
+
+def decode(data: bytes,
+           default: Optional[Callable[[bytes], Any]] = None) -> Any:
+    """
+    Decodes a value written by `Codec.encode`, reading the
+    serializer and the compressor from its header.
+    :param data: The encoded value
+    :param default: Function used for values without a header,
+      e.g. pickle.loads for values written by `redis_set_df`
+    :return: The decoded value
+    """
+    if not is_encoded(data):
+        if default is None:
+            raise ValueError('the value has no codec header')
+        return default(data)
+    payload = memoryview(data)[4:]
+    if data[3]:
+        payload = _by_id(_COMPRESSORS, data[3], 'compressor').decode(payload)
+    return _by_id(_SERIALIZERS, data[2], 'serializer').decode(payload)
@@ -0,0 +1,328 @@
+"""
+An in-process near cache for hot Redis keys, kept coherent by a
+background thread that listens for invalidations from the server.
+"""
+import json
+import time
+import threading
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Union
+
+import redis
+
+INVALIDATION_MODES = ('tracking', 'keyspace', 'pubsub', 'none')
+DEFAULT_CHANNEL = 'redis_utils:near_cache'
+
+
+class NearCache:
+    """
+    A bounded LRU cache of decoded values with a TTL, in front of
+    a Redis client. Entries are dropped when the key changes on
+    the server, using one of the invalidation modes:
+
+    - 'tracking': Redis 6+ client-side caching, CLIENT TRACKING in
+      broadcasting mode redirected to a pub/sub connection (RESP2),
+      covers every write to the tracked prefixes
+    - 'keyspace': keyspace notifications, needs `notify-keyspace-events`
+      with K and A (or the events of the commands used) on the server
+    - 'pubsub': invalidations published on `channel` by the writers
+      of this process and others, covers writes made with `invalidate`
+    - 'none': entries only expire after `ttl`
+
+    'auto' picks the first mode the server supports. While the
+    listener is disconnected every read bypasses the cache and the
+    cache is emptied, since invalidations may have been missed.
+    Cached objects are shared between callers, do not mutate them.
+
+    use: cache = NearCache(redis_client, max_size=10000, ttl=30)
+         cache.get('config', loader)
+         cache.stats()['hit_rate']
+
+    :param client: The Redis client the values are read from
+    :param max_size: Maximum number of cached keys, the least
+      recently used are evicted first
+    :param ttl: Seconds an entry is served without reading Redis
+    :param invalidation: 'auto', 'tracking', 'keyspace', 'pubsub'
+      or 'none'
+    :param prefixes: Key prefixes to cache and track, empty for
+      every key
+    :param channel: Channel used by the 'pubsub' mode
+    :param reconnect_delay: Seconds between listener reconnections
+    """
+
+    def __init__(self, client: redis.Redis, max_size: int = 10_000,
+                 ttl: float = 60.0, invalidation: str = 'auto',
+                 prefixes: Iterable[str] = (),
+                 channel: str = DEFAULT_CHANNEL,
+                 reconnect_delay: float = 1.0):
+        if invalidation not in INVALIDATION_MODES + ('auto',):
+            raise ValueError(f'unknown invalidation mode {invalidation!r}')
+        self.client = client
+        self.max_size = max_size
+        self.ttl = ttl
+        self.prefixes = tuple(prefixes)
+        self.channel = channel
+        self.reconnect_delay = reconnect_delay
+        self.mode = invalidation
+        # key -> (expiration, {loader: value})
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+        # bumped by every invalidation, a load that overlaps one is
+        # not cached since its value may predate the write
+        self._generation = 0
+        self._stats = dict.fromkeys(('hits', 'misses', 'bypassed',
+                                     'evictions', 'expirations',
+                                     'invalidations', 'reconnections'), 0)
+        self._healthy = invalidation == 'none'
+        self._closed = threading.Event()
+        self._pubsub: Optional['redis.client.PubSub'] = None
+        self._listener = self._listener_client() \
+            if invalidation != 'none' else None
+        self._thread: Optional[threading.Thread] = None
+        if self._listener is not None:
+            # connect now so an unsupported mode fails here
+            self._connect()
+            self._thread = threading.Thread(
+                target=self._listen, name='redis-near-cache', daemon=True)
+            self._thread.start()
+
+    def __repr__(self) -> str:
+        return (f'NearCache(mode={self.mode!r}, size={len(self._entries)}, '
+                f'max_size={self.max_size}, ttl={self.ttl})')
+
+    def _listener_client(self) -> redis.Redis:
+        """
+        A client on its own pool for the pub/sub connection. It
+        speaks RESP2, where redirected invalidations arrive as
+        pub/sub messages.
+        """
+        pool = self.client.connection_pool
+        kwargs = dict(pool.connection_kwargs)
+        if int(redis.__version__.split('.')[0]) >= 5:
+            # redis-py 5+ can speak RESP3, drop the options that
+            # only work with it
+            kwargs = {k: v for k, v in kwargs.items()
+                      if not k.startswith('maint_notifications')}
+            kwargs['protocol'] = 2
+        return redis.Redis(connection_pool=redis.ConnectionPool(
+            connection_class=pool.connection_class, **kwargs))
+
+    def _connect(self):
+        """
+        Subscribes the listener and, for 'tracking', turns tracking
+        on for its connection. Resolves 'auto' to a concrete mode.
+        """
+        modes = [self.mode] if self.mode != 'auto' \
+            else ['tracking', 'keyspace', 'pubsub']
+        error = None
+        for mode in modes:
+            pubsub = self._listener.pubsub()
+            try:
+                self._subscribe(pubsub, mode)
+            except redis.exceptions.ResponseError as e:
+                pubsub.close()
+                error = e
+                continue
+            self._pubsub, self.mode = pubsub, mode
+            pubsub.connection.register_connect_callback(self._lost)
+            self.clear()
+            self._healthy = True
+            return
+        raise redis.exceptions.ResponseError(
+            f'the server does not support {" or ".join(modes)} '
+            f'invalidation: {error}')
+
+    def _subscribe(self, pubsub: 'redis.client.PubSub', mode: str):
+        if mode == 'pubsub':
+            pubsub.subscribe(self.channel)
+        elif mode == 'keyspace':
+            events = self._listener.config_get(
+                'notify-keyspace-events').get('notify-keyspace-events', '')
+            if 'K' not in events or not {'A', 'g', '$'} & set(events):
+                raise redis.exceptions.ResponseError(
+                    'keyspace notifications are disabled, set '
+                    'notify-keyspace-events to KA')
+            db = self.client.connection_pool.connection_kwargs.get('db', 0)
+            pubsub.psubscribe(*(f'__keyspace@{db}__:{p}*'
+                                for p in self.prefixes or ('',)))
+        else:
+            # CLIENT ID and TRACKING go on the connection that then
+            # subscribes, tracking redirected to itself
+            connection = self._listener.connection_pool.get_connection(
+                'pubsub')
+            try:
+                connection.send_command('CLIENT', 'ID')
+                client_id = connection.read_response()
+                prefixes = [a for p in self.prefixes
+                            for a in ('PREFIX', p)]
+                connection.send_command('CLIENT', 'TRACKING', 'ON',
+                                        'REDIRECT', client_id, 'BCAST',
+                                        *prefixes)
+                connection.read_response()
+            except BaseException:
+                self._listener.connection_pool.release(connection)
+                raise
+            pubsub.connection = connection
+            pubsub.subscribe('__redis__:invalidate')
+        # wait for the confirmation so no write is missed after this
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            message = pubsub.get_message(timeout=0.1)
+            if message and message['type'] in ('subscribe', 'psubscribe'):
+                return
+        raise redis.exceptions.TimeoutError('no subscribe confirmation')
+
+    def _listen(self):
+        while not self._closed.is_set():
+            try:
+                if not self._healthy:
+                    self._reconnect()
+                    continue
+                message = self._pubsub.get_message(timeout=1.0)
+                if message is not None:
+                    self._handle(message)
+            except (redis.exceptions.ConnectionError,
+                    redis.exceptions.TimeoutError, OSError, ValueError):
+                self._lost()
+
+    def _lost(self, connection: Any = None):
+        """
+        Called when the listener connection fails or is reconnected
+        by redis-py, either way invalidations may have been missed
+        """
+        self._healthy = False
+        self.clear()
+
+    def _reconnect(self):
+        try:
+            self._pubsub.close()
+        except Exception:
+            pass
+        while not self._closed.wait(self.reconnect_delay):
+            try:
+                self._connect()
+            except (redis.exceptions.RedisError, OSError):
+                continue
+            self._stats['reconnections'] += 1
+            return
+
+    def _handle(self, message: Dict[str, Any]):
+        kind = message['type']
+        if kind == 'pmessage':
+            # __keyspace@0__:<key>
+            channel = message['channel'].decode('utf-8', 'replace')
+            self.invalidate(channel.split(':', 1)[1], publish=False)
+        elif kind == 'message':
+            data = message['data']
+            if self.mode == 'tracking':
+                # a null message means the database was flushed
+                if data is None:
+                    self.clear()
+                else:
+                    self.invalidate(*(k.decode('utf-8', 'replace')
+                                      for k in data), publish=False)
+            else:
+                self.invalidate(*json.loads(data), publish=False)
+
+    def cacheable(self, key: str) -> bool:
+        """
+        :return: True if the key starts with one of the prefixes
+        """
+        return not self.prefixes or key.startswith(self.prefixes)
+
+    def get(self, key: str, loader: Callable[[str], Any]) -> Any:
+        """
+        Returns the cached value of the key for this loader, calling
+        `loader(key)` to read it from Redis on a miss. Values of
+        different loaders (e.g. str and dill) are cached separately.
+        :param key: The Redis key
+        :param loader: Function that reads and decodes the key
+        :return: The value
+        """
+        if not self._healthy or not self.cacheable(key):
+            with self._lock:
+                self._stats['bypassed'] += 1
+            return loader(key)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] <= now:
+                    del self._entries[key]
+                    self._stats['expirations'] += 1
+                elif loader in entry[1]:
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return entry[1][loader]
+            self._stats['misses'] += 1
+            generation = self._generation
+        value = loader(key)
+        with self._lock:
+            if generation != self._generation or not self._healthy:
+                return value
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = (now + self.ttl, {})
+                if len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+                    self._stats['evictions'] += 1
+            entry[1][loader] = value
+        return value
+
+    def invalidate(self, *keys: Union[str, bytes], publish: bool = True):
+        """
+        Drops keys from the cache. Write helpers call it after
+        every write, in 'pubsub' mode it also tells the other
+        processes.
+        :param keys: The keys that changed
+        :param publish: If False, only drop them locally
+        """
+        if not keys:
+            return
+        keys = [k.decode('utf-8', 'replace') if isinstance(k, bytes) else k
+                for k in keys]
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                if self._entries.pop(key, None) is not None:
+                    self._stats['invalidations'] += 1
+        if publish and self.mode == 'pubsub':
+            keys = [k for k in keys if self.cacheable(k)]
+            if keys:
+                self.client.publish(self.channel, json.dumps(keys))
+
+    def clear(self):
+        """
+        Drops every entry
+        """
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        :return: The hits, misses, reads that bypassed the cache,
+          evictions, expirations, invalidations and reconnections
+          so far, with the hit rate, size and mode
+        """
+        stats: Dict[str, Any] = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        stats.update(size=len(self._entries), mode=self.mode,
+                     healthy=self._healthy)
+        return stats
+
+    def close(self):
+        """
+        Stops the listener and empties the cache
+        """
+        self._closed.set()
+        self._healthy = False
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        if self._pubsub is not None:
+            self._pubsub.close()
+        if self._listener is not None:
+            self._listener.connection_pool.disconnect()
+        self.clear()
@@ -0,0 +1,357 @@
+"""
+A job queue on Redis Streams consumer groups. Any number of workers on
+any number of machines share a queue just by using the same name.
+"""
+import os
+import time
+import socket
+import threading
+
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+import redis
+
+from . import redis_utils
+from .redis_codecs import Codec, decode
+
+
+class Job(NamedTuple):
+    """
+    A job handed to a worker
+    """
+    id: str
+    payload: Any
+    # 1 on the first delivery, more when it is redelivered
+    deliveries: int
+
+
+class JobFailed(Exception):
+    """
+    Raised by `RedisQueue.result` for a job whose handler raised on
+    its last delivery, with the error message of the handler
+    """
+
+
+class RedisQueue:
+    """
+    A job queue stored in the Redis stream `name` and read through a
+    consumer group, so every job goes to one worker. Jobs stay pending
+    until acknowledged, jobs of a worker that stops or stalls for
+    `visibility_timeout` seconds are claimed by another worker with
+    XAUTOCLAIM. A job delivered `max_deliveries` times is moved to the
+    stream `{name}:dead` and its error stored as its result.
+
+    Keys: `{name}` (the stream), `{name}:result:{id}` (results, which
+    expire after `result_ttl`), `{name}:done:{second}` (throughput
+    counters) and `{name}:dead`.
+
+    use: queue = RedisQueue('scrape')
+         queue.enqueue_many(urls)
+         queue.work(scrape)  # in as many processes as needed
+         queue.stats()['depth']
+
+    :param name: Key of the stream
+    :param group: Consumer group of the workers
+    :param client: Redis client, None for the client of the
+      `redis_utils` functions
+    :param codec: Codec of payloads and results, None for
+      `default_codec`
+    :param visibility_timeout: Seconds a delivered job can stay
+      unacknowledged before it is redelivered
+    :param max_deliveries: Deliveries before a failing job is dead
+    :param result_ttl: Seconds results are kept, 0 to not store them
+    :param max_len: Approximate maximum length of the stream, None
+      for no limit
+    """
+
+    def __init__(self, name: str, group: str = 'workers',
+                 client: Optional[redis.Redis] = None,
+                 codec: Optional[Codec] = None,
+                 visibility_timeout: float = 300,
+                 max_deliveries: int = 5, result_ttl: float = 3600,
+                 max_len: Optional[int] = None):
+        self.name = name
+        self.group = group
+        self._client = client
+        self.codec = codec
+        self.visibility_timeout = visibility_timeout
+        self.max_deliveries = max_deliveries
+        self.result_ttl = result_ttl
+        self.max_len = max_len
+        self._group_ready = False
+        # where the next XAUTOCLAIM scan of the pending jobs starts
+        self._claim_start = '0-0'
+
+    def __repr__(self) -> str:
+        return f'RedisQueue(name={self.name!r}, group={self.group!r})'
+
+    @property
+    def client(self) -> redis.Redis:
+        return self._client or redis_utils.redis_client
+
+    def _codec(self) -> Codec:
+        return self.codec or redis_utils.default_codec
+
+    def _ensure_group(self):
+        if self._group_ready:
+            return
+        try:
+            # id 0 so jobs enqueued before the group exists are read
+            self.client.xgroup_create(self.name, self.group, id='0',
+                                      mkstream=True)
+        except redis.exceptions.ResponseError as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+        self._group_ready = True
+
+    def _xadd(self, client: Any, payload: Any) -> Any:
+        fields = {'data': self._codec().encode(payload)}
+        if self.max_len:
+            return client.xadd(self.name, fields, maxlen=self.max_len,
+                               approximate=True)
+        return client.xadd(self.name, fields)
+
+    def enqueue(self, payload: Any) -> str:
+        """
+        Adds a job with one XADD
+        :param payload: Any value the codec can encode
+        :return: The id of the job
+        """
+        self._ensure_group()
+        return self._xadd(self.client, payload).decode()
+
+    def enqueue_many(self, payloads: Iterable[Any],
+                     chunk_size: int = 1000) -> List[str]:
+        """
+        Adds many jobs, one pipelined round trip per `chunk_size`
+        :param payloads: The payloads of the jobs
+        :param chunk_size: Jobs sent per round trip
+        :return: The ids of the jobs in input order
+        """
+        self._ensure_group()
+        ids = []
+        for chunk in redis_utils._chunks(payloads, chunk_size):
+            pipe = self.client.pipeline(transaction=False)
+            for payload in chunk:
+                self._xadd(pipe, payload)
+            ids.extend(i.decode() for i in pipe.execute())
+        return ids
+
+    def _job(self, entry_id: bytes, fields: Dict[bytes, bytes],
+             deliveries: int) -> Job:
+        return Job(entry_id.decode(), decode(fields[b'data']), deliveries)
+
+    def _claim_stalled(self, consumer: str, count: int) -> List[Job]:
+        """
+        Takes over jobs left unacknowledged by other workers
+        """
+        response = self.client.xautoclaim(
+            self.name, self.group, consumer,
+            int(self.visibility_timeout * 1000), self._claim_start, count)
+        if response and isinstance(response[0], (bytes, str)):
+            self._claim_start, entries = response[0], response[1]
+        else:
+            # redis-py before 4.5 drops the cursor, scan from the start
+            self._claim_start, entries = '0-0', response
+        # deleted entries come back as None (before Redis 7)
+        entries = [(i, f) for i, f in entries if f]
+        if not entries:
+            return []
+        pending = self.client.xpending_range(
+            self.name, self.group, entries[0][0], entries[-1][0],
+            len(entries) * 2, consumer)
+        deliveries = {p['message_id']: p['times_delivered']
+                      for p in pending}
+        return [self._job(i, f, deliveries.get(i, 1)) for i, f in entries]
+
+    def claim(self, consumer: Optional[str] = None, count: int = 10,
+              block: Optional[float] = 5.0) -> List[Job]:
+        """
+        Takes up to `count` jobs for a consumer: stalled jobs of
+        other workers first, then new ones with XREADGROUP, waiting
+        up to `block` seconds for them
+        :param consumer: Name of the worker, see `consumer_name`
+        :param count: Maximum number of jobs
+        :param block: Seconds to wait for new jobs, None to not wait
+        :return: The jobs, acknowledge them with `ack`
+        """
+        self._ensure_group()
+        consumer = consumer or self.consumer_name()
+        jobs = self._claim_stalled(consumer, count)
+        if jobs:
+            return jobs
+        response = self.client.xreadgroup(
+            self.group, consumer, {self.name: '>'}, count=count,
+            block=None if block is None else int(block * 1000))
+        if isinstance(response, dict):
+            # RESP3 replies map the stream to a list of entry lists
+            entries = [e for batch in response.values() for e in batch[0]]
+        else:
+            entries = [e for _, batch in response or () for e in batch]
+        return [self._job(i, f, 1) for i, f in entries]
+
+    def ack(self, *job_ids: str) -> int:
+        """
+        Acknowledges jobs and removes them from the stream, in one
+        round trip
+        :param job_ids: Ids of the finished jobs
+        :return: The number of jobs acknowledged
+        """
+        if not job_ids:
+            return 0
+        pipe = self.client.pipeline(transaction=False)
+        pipe.xack(self.name, self.group, *job_ids)
+        pipe.xdel(self.name, *job_ids)
+        second = int(time.time())
+        pipe.incrby(f'{self.name}:done:{second}', len(job_ids))
+        pipe.expire(f'{self.name}:done:{second}', 3600)
+        return pipe.execute()[0]
+
+    def _store_results(self, results: Dict[str, tuple]):
+        if not self.result_ttl or not results:
+            return
+        pipe = self.client.pipeline(transaction=False)
+        for job_id, outcome in results.items():
+            pipe.set(f'{self.name}:result:{job_id}',
+                     self._codec().encode(outcome),
+                     px=int(self.result_ttl * 1000))
+        pipe.execute()
+
+    def complete(self, results: Dict[str, Any]):
+        """
+        Stores the results of jobs and acknowledges them, in two
+        round trips for the whole batch
+        :param results: Job ids and their results
+        """
+        self._store_results({i: (True, r) for i, r in results.items()})
+        self.ack(*results)
+
+    def fail(self, job: Job, error: str) -> bool:
+        """
+        Records a failed delivery. The job is left pending, so it is
+        redelivered after `visibility_timeout`, unless it has been
+        delivered `max_deliveries` times: then it is moved to
+        `{name}:dead`, its error stored as its result and acknowledged.
+        :param job: The job whose handler failed
+        :param error: Description of the error
+        :return: True if the job is dead
+        """
+        if job.deliveries < self.max_deliveries:
+            return False
+        self.client.xadd(f'{self.name}:dead',
+                         {'id': job.id, 'error': error,
+                          'data': self._codec().encode(job.payload)})
+        self._store_results({job.id: (False, error)})
+        self.ack(job.id)
+        return True
+
+    def work(self, handler: Callable[[Any], Any],
+             consumer: Optional[str] = None, batch_size: int = 10,
+             block: float = 5.0, stop: Optional[threading.Event] = None,
+             max_jobs: Optional[int] = None) -> int:
+        """
+        Runs a worker: claims jobs in batches, calls `handler` with
+        the payload of each one, stores the results and acknowledges
+        the batch. Handlers that raise leave their job for
+        redelivery, see `fail`. Start more workers (threads,
+        processes or machines) to scale out.
+        :param handler: Function of the payload that returns the result
+        :param consumer: Name of the worker, see `consumer_name`
+        :param batch_size: Jobs claimed per round trip
+        :param block: Seconds each read waits for new jobs
+        :param stop: Event that stops the worker after its batch
+        :param max_jobs: Stop after this many jobs, None to run until
+          `stop` is set
+        :return: The number of jobs processed
+        """
+        consumer = consumer or self.consumer_name()
+        processed = 0
+        while not (stop is not None and stop.is_set()) \
+                and (max_jobs is None or processed < max_jobs):
+            count = batch_size if max_jobs is None \
+                else min(batch_size, max_jobs - processed)
+            results = {}
+            for job in self.claim(consumer, count, block):
+                try:
+                    results[job.id] = handler(job.payload)
+                except Exception as e:
+                    self.fail(job, f'{type(e).__name__}: {e}')
+                processed += 1
+            self.complete(results)
+        return processed
+
+    def result(self, job_id: str, timeout: float = 0,
+               poll: float = 0.05) -> Any:
+        """
+        Returns the result of a job, waiting up to `timeout` seconds
+        for it
+        :param job_id: Id returned by `enqueue`
+        :param timeout: Seconds to wait, 0 to check once
+        :param poll: Seconds between checks while waiting
+        :raises JobFailed: If the job is dead
+        :raises TimeoutError: If there is no result yet
+        :return: The value returned by the handler
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            data = self.client.get(f'{self.name}:result:{job_id}')
+            if data is not None:
+                ok, value = decode(data)
+                if not ok:
+                    raise JobFailed(value)
+                return value
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f'job {job_id} has no result')
+            time.sleep(poll)
+
+    def stats(self, window: int = 60) -> Dict[str, Any]:
+        """
+        :param window: Seconds the throughput is averaged over
+        :return: The jobs waiting (`depth`), delivered but not
+          acknowledged (`pending`), dead, the consumers active in the
+          last `visibility_timeout` seconds, and the jobs completed
+          in the last `window` seconds by all workers with their
+          rate per second (`throughput`)
+        """
+        self._ensure_group()
+        now = int(time.time())
+        pipe = self.client.pipeline(transaction=False)
+        pipe.xlen(self.name)
+        pipe.xpending(self.name, self.group)
+        pipe.xlen(f'{self.name}:dead')
+        pipe.xinfo_consumers(self.name, self.group)
+        # the current second is not over yet
+        pipe.mget([f'{self.name}:done:{s}'
+                   for s in range(now - window, now)])
+        length, pending, dead, consumers, done = pipe.execute()
+        pending = pending['pending']
+        completed = sum(int(d) for d in done if d)
+        # consumers are never removed, count the recently active ones
+        active = sum(1 for c in consumers
+                     if c['idle'] < self.visibility_timeout * 1000)
+        return {'depth': length - pending, 'pending': pending,
+                'dead': dead, 'consumers': active,
+                'completed': completed, 'throughput': completed / window}
+
+    @staticmethod
+    def consumer_name() -> str:
+        """
+        :return: A consumer name unique to this host, process and
+          thread
+        """
+        return f'{socket.gethostname()}:{os.getpid()}:' \
+               f'{threading.get_ident()}'
+
+    def purge(self) -> int:
+        """
+        Deletes the stream, its dead jobs, results and counters
+        :return: The number of keys deleted
+        """
+        self._group_ready = False
+        self._claim_start = '0-0'
+        deleted = self.client.unlink(self.name, f'{self.name}:dead')
+        for pattern in (f'{self.name}:result:*', f'{self.name}:done:*'):
+            keys = list(self.client.scan_iter(pattern, count=1000))
+            for chunk in redis_utils._chunks(keys, 1000):
+                deleted += self.client.unlink(*chunk)
+        return deleted
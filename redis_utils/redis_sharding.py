@@ -0,0 +1,571 @@
+"""
+Client-side sharding for deployments without Redis Cluster: keys are
+spread across several Redis servers with consistent hashing.
+"""
+import re
+import bisect
+import hashlib
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import (Any, Callable, Dict, Iterable, List, Optional, Tuple,
+                    Union)
+
+import redis
+
+from redis.commands import CoreCommands
+
+# keys the redis_utils helpers derive from a key, routed with it when
+# `derived_keys` is set so the scripts that use both run on one
+# server: `{key}:scores` of the autocomplete index, `{key}:tmp:{uuid}`
+# of columnar dataframes and `{key}:chunks:{version}:{i}` of chunked
+# values
+DERIVED_KEY = re.compile(
+    rb'(.+?):(?:scores|tmp:[0-9a-f-]+|chunks:[0-9a-f]+:\d+)\Z', re.S)
+
+# commands without keys sent to every shard, and how their replies
+# are combined
+_BROADCAST: Dict[str, Callable[[List[Any]], Any]] = {
+    'PING': lambda r: all(r),
+    'FLUSHDB': lambda r: all(r),
+    'FLUSHALL': lambda r: all(r),
+    'SCRIPT LOAD': lambda r: r[0],
+    'SCRIPT FLUSH': lambda r: all(r),
+    'CONFIG SET': lambda r: all(r),
+    'DBSIZE': sum,
+}
+# multi-key commands split per shard, and how their replies are
+# combined
+_FAN_OUT: Dict[str, Callable[[List[Any]], Any]] = {
+    'DEL': sum,
+    'UNLINK': sum,
+    'EXISTS': sum,
+    'TOUCH': sum,
+    'MSET': lambda r: all(r),
+}
+
+# plan of a command: (shard name, args, options) per shard and the
+# function that combines their replies, or a callable that runs it
+Plan = Union[Tuple[List[Tuple[str, tuple, dict]], Callable], Callable[[], Any]]
+
+
+def _as_bytes(key: Any) -> bytes:
+    if isinstance(key, bytes):
+        return key
+    if isinstance(key, memoryview):
+        return key.tobytes()
+    return str(key).encode('utf-8')
+
+
+def _first(replies: List[Any]) -> Any:
+    return replies[0]
+
+
+class HashRing:
+    """
+    A consistent hash ring: each node owns `virtual_nodes` points
+    of a 64-bit ring and a key belongs to the node of the first
+    point after its hash. Adding or removing a node only moves the
+    keys between its points and the previous ones, about 1/N of
+    them.
+
+    With `hash_tags`, only the part of a key between the first `{`
+    and the next `}` is hashed when it is not empty, as in Redis
+    Cluster, so `{user:1}:profile` and `{user:1}:cart` share a node.
+    With `derived_keys`, the keys the redis_utils helpers derive
+    from a key (see `DERIVED_KEY`) go to the node of their key.
+
+    :param nodes: Names of the nodes, e.g. their URLs
+    :param virtual_nodes: Points per node, more spread the keys
+      more evenly
+    :param hash_tags: If True, honor hash tags
+    :param derived_keys: If True, route the keys derived by the
+      redis_utils helpers with their key
+    """
+
+    def __init__(self, nodes: Iterable[str] = (), virtual_nodes: int = 160,
+                 hash_tags: bool = True, derived_keys: bool = False):
+        self.virtual_nodes = virtual_nodes
+        self.hash_tags = hash_tags
+        self.derived_keys = derived_keys
+        self.nodes: List[str] = []
+        self._points: List[int] = []
+        self._owners: List[str] = []
+        for node in nodes:
+            self.add(node)
+
+    def __repr__(self) -> str:
+        return (f'HashRing(nodes={self.nodes!r}, '
+                f'virtual_nodes={self.virtual_nodes})')
+
+    @staticmethod
+    def _hash(data: bytes) -> int:
+        return int.from_bytes(hashlib.md5(data).digest()[:8], 'big')
+
+    def routing_key(self, key: Any) -> bytes:
+        """
+        :param key: A Redis key
+        :return: The part of the key that is hashed
+        """
+        key = _as_bytes(key)
+        if self.derived_keys:
+            match = DERIVED_KEY.match(key)
+            if match is not None:
+                key = match.group(1)
+        if self.hash_tags:
+            start = key.find(b'{')
+            if start != -1:
+                end = key.find(b'}', start + 1)
+                if end > start + 1:
+                    return key[start + 1:end]
+        return key
+
+    def add(self, node: str):
+        """
+        Adds a node and its virtual nodes to the ring
+        :param node: Name of the node
+        """
+        if node in self.nodes:
+            raise ValueError(f'{node!r} is already in the ring')
+        self.nodes.append(node)
+        for i in range(self.virtual_nodes):
+            point = self._hash(f'{node}#{i}'.encode('utf-8'))
+            index = bisect.bisect(self._points, point)
+            self._points.insert(index, point)
+            self._owners.insert(index, node)
+
+    def remove(self, node: str):
+        """
+        Removes a node and its virtual nodes from the ring
+        :param node: Name of the node
+        """
+        self.nodes.remove(node)
+        kept = [(p, o) for p, o in zip(self._points, self._owners)
+                if o != node]
+        self._points = [p for p, _ in kept]
+        self._owners = [o for _, o in kept]
+
+    def node_for(self, key: Any) -> str:
+        """
+        :param key: A Redis key
+        :return: The name of the node that owns the key
+        """
+        if not self._points:
+            raise ValueError('the ring has no nodes')
+        index = bisect.bisect(self._points,
+                              self._hash(self.routing_key(key)))
+        return self._owners[index % len(self._owners)]
+
+
+class ShardedRedis(CoreCommands):
+    """
+    A client with the commands of redis.Redis that spreads keys
+    across several Redis servers with a `HashRing`. Single-key
+    commands and scripts go to the shard of their key, multi-key
+    commands (MGET, MSET, DEL, UNLINK, EXISTS, TOUCH) are split per
+    shard and sent in parallel, SCAN walks every shard in turn and
+    pipelines send one pipeline per shard in parallel.
+
+    Commands and scripts whose keys must be on one server (MSETNX,
+    EVALSHA, XREAD) raise ValueError when they are not, use hash
+    tags to keep such keys together. RENAME across shards is a
+    DUMP/RESTORE and a DEL, so it is not atomic, and MULTI/EXEC
+    pipelines are only atomic per shard. Every process must use
+    the same shard names.
+
+    use: client = ShardedRedis({url: redis.Redis.from_url(url)
+                                for url in urls})
+         client.mget(keys)  # one MGET per shard, in parallel
+         client.add_shard(new_url, redis.Redis.from_url(new_url))
+         client.rebalance()
+
+    :param shards: Names of the shards (e.g. their URLs) and their
+      clients
+    :param virtual_nodes: Points of each shard on the ring
+    :param hash_tags: If True, keys with the same `{tag}` share a
+      shard
+    :param max_workers: Threads used to reach the shards in
+      parallel
+    :param derived_keys: If True, the keys the redis_utils helpers
+      derive from a key share its shard, needed to use the helpers
+      with this client (`RedisStore.sharded` sets it)
+    """
+
+    def __init__(self, shards: Dict[str, redis.Redis],
+                 virtual_nodes: int = 160, hash_tags: bool = True,
+                 max_workers: int = 16, derived_keys: bool = False):
+        if not shards:
+            raise ValueError('at least one shard is needed')
+        self.shards: Dict[str, redis.Redis] = dict(shards)
+        self.ring = HashRing(self.shards, virtual_nodes, hash_tags,
+                             derived_keys)
+        # shards removed from the ring whose keys are not moved yet
+        self._retired: Dict[str, redis.Redis] = {}
+        self._executor = ThreadPoolExecutor(
+            max_workers, thread_name_prefix='redis-shard')
+
+    def __repr__(self) -> str:
+        return f'ShardedRedis(shards={list(self.shards)!r})'
+
+    def get_encoder(self) -> Any:
+        # used by redis-py to compute the SHA1 of scripts
+        return next(iter(self.shards.values())) \
+            .connection_pool.get_encoder()
+
+    def shard_name(self, key: Any) -> str:
+        """
+        :param key: A Redis key
+        :return: The name of the shard that owns the key
+        """
+        return self.ring.node_for(key)
+
+    def shard_for(self, key: Any) -> redis.Redis:
+        """
+        :param key: A Redis key
+        :return: The client of the shard that owns the key
+        """
+        return self.shards[self.ring.node_for(key)]
+
+    def _clients(self) -> List[Tuple[str, redis.Redis]]:
+        return list(self.shards.items()) + list(self._retired.items())
+
+    def _map(self, function: Callable[[Any], Any],
+             items: List[Any]) -> List[Any]:
+        """
+        Calls the function on every item, in parallel when there
+        are several, and raises the first error after all finished
+        """
+        if len(items) == 1:
+            return [function(items[0])]
+        try:
+            futures = [self._executor.submit(function, i) for i in items]
+        except RuntimeError:
+            # the interpreter is exiting and has stopped the executor,
+            # e.g. for a flush registered with atexit
+            return [function(i) for i in items]
+        errors = [f.exception() for f in futures]
+        for error in errors:
+            if error is not None:
+                raise error
+        return [f.result() for f in futures]
+
+    def _same_shard(self, command: str, keys: Iterable[Any]) -> str:
+        names = {self.ring.node_for(k) for k in keys}
+        if len(names) > 1:
+            raise ValueError(f'{command} keys map to different shards, '
+                             'give them the same {hash tag}')
+        return names.pop() if names else next(iter(self.shards))
+
+    def _plan(self, args: tuple, options: dict) -> Plan:
+        """
+        Decides which shards a command goes to
+        """
+        command = args[0].decode() if isinstance(args[0], bytes) \
+            else args[0]
+        command = command.upper()
+        if command in _BROADCAST:
+            return ([(name, args, options) for name in self.shards],
+                    _BROADCAST[command])
+        if command == 'MGET':
+            return self._split(args, options, 1, _first)
+        if command in _FAN_OUT:
+            return self._split(args, options, 2 if command == 'MSET'
+                               else 1, _FAN_OUT[command])
+        if command in ('RENAME', 'RENAMENX'):
+            source, target = (self.ring.node_for(k) for k in args[1:3])
+            if source != target:
+                return lambda: self._move_one(args[1], args[2],
+                                              command == 'RENAMENX')
+            return [(source, args, options)], _first
+        if command in ('EVAL', 'EVALSHA', 'EVAL_RO', 'EVALSHA_RO'):
+            keys = args[3:3 + int(args[2])]
+            name = self._same_shard(command, keys)
+        elif command == 'MSETNX':
+            name = self._same_shard(command, args[1::2])
+        elif command in ('XREAD', 'XREADGROUP'):
+            start = [_as_bytes(a).upper() for a in args].index(b'STREAMS') + 1
+            keys = args[start:start + (len(args) - start) // 2]
+            name = self._same_shard(command, keys)
+        elif len(args) > 1:
+            name = self.ring.node_for(args[1])
+        else:
+            # TIME, INFO and other server commands
+            name = next(iter(self.shards))
+        return [(name, args, options)], _first
+
+    def _split(self, args: tuple, options: dict, width: int,
+               combine: Callable[[List[Any]], Any]) -> Plan:
+        """
+        Splits a multi-key command into one command per shard,
+        `width` arguments per key
+        """
+        groups: Dict[str, List[int]] = {}
+        for position in range(1, len(args), width):
+            name = self.ring.node_for(args[position])
+            groups.setdefault(name, []).append(position)
+        if len(groups) == 1:
+            return [(name, args, options)], _first
+        parts = []
+        for name, positions in groups.items():
+            sub = tuple(a for p in positions for a in args[p:p + width])
+            sub_options = dict(options)
+            if 'keys' in sub_options:
+                sub_options['keys'] = list(sub[::width])
+            parts.append((name, (args[0],) + sub, sub_options))
+        if combine is not _first:
+            return parts, combine
+        # MGET, put the values back in the order of the keys
+        total = len(args) - 1
+
+        def merge(replies: List[Any]) -> List[Any]:
+            values = [None] * total
+            for positions, reply in zip(groups.values(), replies):
+                for position, value in zip(positions, reply):
+                    values[position - 1] = value
+            return values
+        return parts, merge
+
+    def _move_one(self, key: Any, new_key: Any, nx: bool) -> bool:
+        """
+        RENAME or RENAMENX across shards with DUMP/RESTORE
+        """
+        source, target = self.shard_for(key), self.shard_for(new_key)
+        pipe = source.pipeline(transaction=False)
+        pipe.dump(key)
+        pipe.pttl(key)
+        data, ttl = pipe.execute()
+        if data is None:
+            raise redis.exceptions.ResponseError('no such key')
+        try:
+            target.restore(new_key, max(ttl, 0), data, replace=not nx)
+        except redis.exceptions.ResponseError as e:
+            if nx and 'BUSYKEY' in str(e):
+                return False
+            raise
+        source.delete(key)
+        return True
+
+    def execute_command(self, *args, **options) -> Any:
+        plan = self._plan(args, options)
+        if callable(plan):
+            return plan()
+        parts, combine = plan
+        replies = self._map(
+            lambda part: self.shards[part[0]].execute_command(
+                *part[1], **part[2]), parts)
+        return combine(replies)
+
+    def scan(self, cursor: Union[int, str] = 0, match: Optional[str] = None,
+             count: Optional[int] = None, _type: Optional[str] = None,
+             **kwargs) -> Tuple[int, List[bytes]]:
+        """
+        SCAN over every shard, one after the other. The cursor
+        holds the shard and its own cursor, so it can be saved and
+        resumed as long as the shards do not change.
+        """
+        clients = self._clients()
+        cursor = int(cursor)
+        index, position = cursor % len(clients), cursor // len(clients)
+        position, keys = clients[index][1].scan(
+            position, match=match, count=count, _type=_type, **kwargs)
+        if position == 0:
+            index += 1
+            if index == len(clients):
+                return 0, keys
+        return position * len(clients) + index, keys
+
+    def pipeline(self, transaction: bool = True,
+                 shard_hint: Optional[str] = None) -> 'ShardedPipeline':
+        return ShardedPipeline(self, transaction)
+
+    def add_shard(self, name: str, client: redis.Redis):
+        """
+        Adds a server to the ring. The keys it now owns stay on
+        their previous shard, and read as missing, until
+        `rebalance` moves them.
+        :param name: Name of the shard, e.g. its URL
+        :param client: Client of the shard
+        """
+        self.ring.add(name)
+        self.shards[name] = client
+
+    def remove_shard(self, name: str) -> redis.Redis:
+        """
+        Removes a server from the ring. Its keys are moved to the
+        remaining shards by the next `rebalance`.
+        :param name: Name of the shard
+        :return: Its client, to close once rebalanced
+        """
+        self.ring.remove(name)
+        client = self._retired[name] = self.shards.pop(name)
+        return client
+
+    def rebalance(self, count: int = 1000,
+                  progress: Optional[Callable[[Dict[str, int]], Any]] = None
+                  ) -> Dict[str, int]:
+        """
+        Moves the keys that are not on the shard that owns them,
+        after `add_shard` or `remove_shard`. Every shard is scanned
+        but only the affected keys move, with DUMP/PTTL and RESTORE
+        in one pipeline per page and shard. A key written to its new
+        shard in the meantime is kept and the old copy dropped.
+        :param count: Keys per SCAN page
+        :param progress: Called with the stats after every page
+        :return: The keys scanned, moved and skipped (newer on
+          their new shard, or gone before being moved)
+        """
+        stats = dict.fromkeys(('scanned', 'moved', 'skipped'), 0)
+        for name, client in self._clients():
+            cursor = None
+            while cursor != 0:
+                cursor, keys = client.scan(cursor or 0, count=count)
+                stats['scanned'] += len(keys)
+                misplaced = [k for k in keys if self.ring.node_for(k) != name]
+                if misplaced:
+                    moved = self._move_keys(client, misplaced)
+                    stats['moved'] += moved
+                    stats['skipped'] += len(misplaced) - moved
+                if progress is not None:
+                    progress(dict(stats))
+        self._retired.clear()
+        return stats
+
+    def _move_keys(self, source: redis.Redis, keys: List[bytes]) -> int:
+        pipe = source.pipeline(transaction=False)
+        for key in keys:
+            pipe.dump(key)
+            pipe.pttl(key)
+        replies = pipe.execute()
+        groups: Dict[str, List[tuple]] = {}
+        for key, data, ttl in zip(keys, replies[::2], replies[1::2]):
+            if data is not None:
+                groups.setdefault(self.ring.node_for(key), []).append(
+                    (key, data, max(ttl, 0)))
+
+        def restore(item: Tuple[str, List[tuple]]) -> int:
+            pipe = self.shards[item[0]].pipeline(transaction=False)
+            for key, data, ttl in item[1]:
+                pipe.restore(key, ttl, data)
+            restored = 0
+            for reply in pipe.execute(raise_on_error=False):
+                if not isinstance(reply, Exception):
+                    restored += 1
+                elif 'BUSYKEY' not in str(reply):
+                    raise reply
+            return restored
+        moved = sum(self._map(restore, list(groups.items()))) \
+            if groups else 0
+        source.unlink(*keys)
+        return moved
+
+    @property
+    def round_trips(self) -> int:
+        """
+        Round trips made to every shard, counted by shards that are
+        CountingRedis clients
+        """
+        return sum(getattr(c, 'round_trips', 0) for _, c in self._clients())
+
+    def reset_round_trips(self) -> int:
+        return sum(c.reset_round_trips() for _, c in self._clients()
+                   if hasattr(c, 'reset_round_trips'))
+
+    @property
+    def histograms(self) -> Any:
+        return getattr(next(iter(self.shards.values())), 'histograms', None)
+
+    @histograms.setter
+    def histograms(self, histograms: Any):
+        # one set of histograms for all the shards
+        for _, client in self._clients():
+            client.histograms = histograms
+
+    def close(self):
+        """
+        Stops the worker threads and closes the connections of
+        every shard
+        """
+        self._executor.shutdown(wait=False)
+        for _, client in self._clients():
+            client.close()
+
+
+class ShardedPipeline(CoreCommands):
+    """
+    A pipeline of a ShardedRedis: commands are queued on one
+    pipeline per shard and `execute` runs them in parallel, one
+    round trip per shard, returning the replies in the order the
+    commands were queued. Commands that span shards and cannot be
+    split (RENAME) run after the pipelines.
+    """
+
+    def __init__(self, client: ShardedRedis, transaction: bool = True):
+        self.client = client
+        self.transaction = transaction
+        self._pipes: Dict[str, Any] = {}
+        self._sizes: Dict[str, int] = {}
+        # per command, its (shard, position) replies and how to
+        # combine them, or the callable that runs it
+        self._slots: List[Any] = []
+
+    def __enter__(self) -> 'ShardedPipeline':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.reset()
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _queue(self, name: str, args: tuple, options: dict) -> int:
+        pipe = self._pipes.get(name)
+        if pipe is None:
+            pipe = self._pipes[name] = self.client.shards[name].pipeline(
+                self.transaction)
+            self._sizes[name] = 0
+        pipe.execute_command(*args, **options)
+        self._sizes[name] += 1
+        return self._sizes[name] - 1
+
+    def execute_command(self, *args, **options) -> 'ShardedPipeline':
+        plan = self.client._plan(args, options)
+        if callable(plan):
+            self._slots.append(plan)
+        else:
+            parts, combine = plan
+            self._slots.append(([(name, self._queue(name, a, o))
+                                 for name, a, o in parts], combine))
+        return self
+
+    def execute(self, raise_on_error: bool = True) -> List[Any]:
+        names = list(self._pipes)
+        try:
+            replies = dict(zip(names, self.client._map(
+                lambda name: self._pipes[name].execute(raise_on_error),
+                names)))
+            results = []
+            for slot in self._slots:
+                if callable(slot):
+                    try:
+                        results.append(slot())
+                    except redis.exceptions.ResponseError as e:
+                        if raise_on_error:
+                            raise
+                        results.append(e)
+                    continue
+                parts, combine = slot
+                values = [replies[name][position]
+                          for name, position in parts]
+                error = next((v for v in values
+                              if isinstance(v, Exception)), None)
+                results.append(error if error is not None
+                               else combine(values))
+            return results
+        finally:
+            self.reset()
+
+    def reset(self):
+        for pipe in self._pipes.values():
+            pipe.reset()
+        self._pipes.clear()
+        self._sizes.clear()
+        self._slots.clear()
@@ -0,0 +1,43 @@
+"""
+A module with regex functions to validate strings, clean them and create validators.
+
+The functions are loaded lazily on first access (PEP 562), so importing
+the package does not import `regex_utils.regex_utils` or its dependencies until one
+of them is used.
+"""
+import importlib
+
+_SUBMODULES = {
+    'regex_utils': (
+        'PATTERNS', 'TYPES', 'EXTRACT_PATTERNS', 'MIN_OVERLAP',
+        'register_pattern', 'validate', 'validate_many', 'validator',
+        'make_validator', 'classify', 'classify_many', 'is_alpha',
+        'is_numeric', 'is_alphanumeric', 'is_valid_email',
+        'is_valid_url', 'is_valid_phone_number_e164',
+        'is_valid_postal_code', 'is_valid_date', 'is_valid_time',
+        'is_valid_datetime', 'is_valid_ipv4', 'is_valid_ipv6',
+        'is_valid_coordinate', 'extract_all', 'extract_stream',
+        'extract_file', 'remove_symbols', 'remove_spaces',
+        'separate_numbers_letters',
+    ),
+}
+_LAZY = {name: module for module, names in _SUBMODULES.items()
+         for name in names}
+
+__all__ = list(_LAZY)
+
+
+def __getattr__(name: str):
+    if name in _SUBMODULES:
+        return importlib.import_module(f'{__name__}.{name}')
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(
+            f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(f'{__name__}.{module}'), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY) | set(_SUBMODULES))
@@ -1,16 +1,202 @@
 import os
 import re
-import sys
+import mmap
+import functools
+
+from typing import (IO, Callable, Dict, Iterable, Iterator, List, Optional,
+                    Set, Tuple, Union)
+
+# The patterns of the validators, anchored at both ends. They are
+# compiled once at import without the anchors: validation uses
+# fullmatch and extraction searches for the first match in the text.
+PATTERNS = {
+    'alpha': r'^[a-zA-Z]+$',
+    'numeric': r'^-?\d*\.?\d+$',
+    'alphanumeric': r'^[a-zA-Z0-9]+$',
+    'email': r'^\w+([\.-]?\w+)*@\w+([\.-]?\w+)*(\.\w{2,3})+$',
+    'url': r'^(https?://)?(?:[-\w.]|(?:%[\da-fA-F]{2}))+/?[\w.-]*$',
+    'phone_number_e164': r'^\+[1-9]\d{8,14}$',
+    'postal_code': r'^[1-9]\d{5}$',
+    'date': r'^\d{4}-\d{2}-\d{2}$',
+    'time': r'^\d{2}:\d{2}:\d{2}$',
+    'datetime': r'^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}$',
+    'ipv4': r'^(?:(?:1?\d{1,2}|2[0-4]\d|25[0-5])\.){3}(?:1?\d{1,2}|2[0-4]\d|25[0-5])$',
+    'ipv6': r'''^(([0-9a-fA-F]{1,4}:){7,7}[0-9a-fA-F]{1,4}|([0-9a-fA-F]{1,4}:){1,7}:|([0-9a-fA-F]{1,4}:){1,6}:[0-9a-fA-F]{1,4}|([0-9a-fA-F]{1,4}:){1,5}(:[0-9a-fA-F]{1,4}){1,2}|([0-9a-fA-F]{1,4}:){1,4}(:[0-9a-fA-F]{1,4}){1,3}|([0-9a-fA-F]{1,4}:){1,3}(:[0-9a-fA-F]{1,4}){1,4}|([0-9a-fA-F]{1,4}:){1,2}(:[0-9a-fA-F]{1,4}){1,5}|[0-9a-fA-F]{1,4}:((:[0-9a-fA-F]{1,4}){1,6})|:((:[0-9a-fA-F]{1,4}){1,7}|:)|fe80:(:[0-9a-fA-F]{0,4}){0,4}%[0-9a-zA-Z]{1,}|::(ffff(:0{1,4}){0,1}:){0,1}((25[0-5]|(2[0-4]|1{0,1}[0-9]){0,1}[0-9])\.){3,3}(25[0-5]|(2[0-4]|1{0,1}[0-9]){0,1}[0-9])|([0-9a-fA-F]{1,4}:){1,4}:((25[0-5]|(2[0-4]|1{0,1}[0-9]){0,1}[0-9])\.){3,3}(25[0-5]|(2[0-4]|1{0,1}[0-9]){0,1}[0-9]))$''',
+    'coordinate': r'''^\(\s*([+-]?(90(\.0+)?|[1-8]?[0-9](\.[0-9]+)?))\s*,\s*([+-]?(180(\.0+)?|1[0-7][0-9](\.[0-9]+)?|[1-9]?[0-9](\.[0-9]+)?))\s*\)$''',
+}
+
+_REPEATED_PAIR = re.compile(r'(\d)(?=\d\1)')
+
+# name -> (the characters a match can start with, minimum length,
+# maximum length, a character every match contains). `classify` skips
+# the pattern of a value that fails any of them without running it.
+_PREFILTERS = {
+    'alpha': (re.compile(r'[a-zA-Z]'), 1, None, None),
+    'numeric': (re.compile(r'[-.\d]'), 1, None, None),
+    'alphanumeric': (re.compile(r'[a-zA-Z0-9]'), 1, None, None),
+    'email': (re.compile(r'\w'), 6, None, '@'),
+    'url': (re.compile(r'[-\w.%]'), 1, None, None),
+    'phone_number_e164': (re.compile(r'\+'), 10, 16, None),
+    'postal_code': (re.compile(r'[1-9]'), 6, 6, None),
+    'date': (re.compile(r'\d'), 10, 10, '-'),
+    'time': (re.compile(r'\d'), 8, 8, ':'),
+    'datetime': (re.compile(r'\d'), 19, 19, ':'),
+    'ipv4': (re.compile(r'\d'), 7, 15, '.'),
+    'ipv6': (re.compile(r'[\da-fA-F:]'), 2, None, ':'),
+    'coordinate': (re.compile(r'\('), 5, None, ','),
+}
+
+# The types reported by `classify` and the registered patterns that
+# make a value one of them
+TYPES = {
+    'email': ('email',),
+    'url': ('url',),
+    'ip': ('ipv4', 'ipv6'),
+    'date': ('date', 'datetime'),
+    'time': ('time',),
+    'phone': ('phone_number_e164',),
+    'number': ('numeric',),
+}
+
+# name -> (compiled pattern without anchors, extra check of the text)
+_REGISTRY: Dict[str, Tuple[re.Pattern, Optional[Callable[[str], bool]]]] = {}
+# types -> classifier built by `_classifier`
+_CLASSIFIERS: Dict[tuple, Callable[[str], Set[str]]] = {}
+
+
+def _strip_anchors(pattern: str) -> str:
+    """
+    Removes a leading ^ and a trailing unescaped $ from a pattern,
+    leaving patterns without them untouched.
+    """
+    if pattern.startswith('^'):
+        pattern = pattern[1:]
+    if pattern.endswith('$'):
+        backslashes = len(pattern[:-1]) - len(pattern[:-1].rstrip('\\'))
+        if backslashes % 2 == 0:
+            pattern = pattern[:-1]
+    return pattern
+
+
+def register_pattern(name: str, pattern: str,
+                     check: Optional[Callable[[str], bool]] = None):
+    """
+    Compiles a pattern and adds it to the registry used by
+    `validate` and `validate_many`, replacing any pattern with
+    the same name.
 
-from unidecode import unidecode
-from typing import Union, Optional
+    Args:
+        name (str): The name the pattern is looked up by.
+        pattern (str): The regular expression, with or without
+            the ^ and $ anchors.
+        check (callable): An optional extra test of the whole text,
+            called only when the pattern matches.
+    """
+    if PATTERNS.get(name) != pattern:
+        _PREFILTERS.pop(name, None)
+    PATTERNS[name] = pattern
+    _REGISTRY[name] = (re.compile(_strip_anchors(pattern)), check)
+    _CLASSIFIERS.clear()
+
+
+def _lookup(name: str
+            ) -> Tuple[re.Pattern, Optional[Callable[[str], bool]]]:
+    try:
+        return _REGISTRY[name]
+    except KeyError:
+        raise ValueError(f'unknown pattern {name!r}, expected one of '
+                         f'{", ".join(_REGISTRY)}') from None
+
+
+def _possible(rule: tuple, value: str) -> bool:
+    """
+    :return: False if a prefilter rule rules out a full match
+    """
+    first, low, high, required = rule
+    return (low <= len(value) and (high is None or len(value) <= high)
+            and (required is None or required in value)
+            and first.match(value) is not None)
+
+
+def validate(name: str, text: str,
+             extract: bool = False) -> Union[bool, str]:
+    """
+    Checks a string against a registered pattern.
+
+    Args:
+        name (str): The name of the pattern, e.g. 'email' or 'ipv6'.
+        text (str): The string to be validated.
+        extract (bool): If True, returns the first match found
+            anywhere in the string instead of a boolean.
+
+    Returns:
+        bool or str: True if the whole string matches the pattern.
+        If extract is True, the matched text. Otherwise, False.
+
+    Examples:
+    >>> validate('ipv4', '10.0.0.1')
+    True
+    >>> validate('email', 'mail: jo@mail.com', extract=True)
+    'jo@mail.com'
+    """
+    pattern, check = _lookup(name)
+    if not extract:
+        rule = _PREFILTERS.get(name)
+        if rule is not None and not _possible(rule, text):
+            return False
+    match = pattern.search(text) if extract else pattern.fullmatch(text)
+    if match is None or (check is not None and not check(text)):
+        return False
+    return match.group() if extract else True
+
+
+def validate_many(name: str, values: Iterable[str],
+                  extract: bool = False) -> List[Union[bool, str]]:
+    """
+    Checks every string of an iterable against a registered
+    pattern, looking the compiled pattern up only once.
+
+    Args:
+        name (str): The name of the pattern, e.g. 'email' or 'ipv6'.
+        values (iterable): The strings to be validated.
+        extract (bool): If True, returns the first match found
+            in each string instead of a boolean.
+
+    Returns:
+        list: One result per value, as `validate` would return it.
+
+    Examples:
+    >>> validate_many('date', ['2023-01-31', '31/01/2023'])
+    [True, False]
+    """
+    pattern, check = _lookup(name)
+    rule = None if extract else _PREFILTERS.get(name)
+    if not extract and check is None:
+        fullmatch = pattern.fullmatch
+        if rule is None:
+            return [fullmatch(value) is not None for value in values]
+        return [_possible(rule, value) and fullmatch(value) is not None
+                for value in values]
+    find = pattern.search if extract else pattern.fullmatch
+    results: List[Union[bool, str]] = []
+    for value in values:
+        if rule is not None and not _possible(rule, value):
+            results.append(False)
+            continue
+        match = find(value)
+        if match is None or (check is not None and not check(value)):
+            results.append(False)
+        else:
+            results.append(match.group() if extract else True)
+    return results
 
 
 def validator(pattern: str, extract: bool = False) -> callable:
     """
     A decorator function that takes a regular expression pattern
     and returns a function that checks if the given pattern matches
-    the input string. If `extract` is True, the function returns
+    the input string and then calls the decorated function with
+    it as an extra check. If `extract` is True, the function returns
     the matching text, otherwise it returns True if there is a match,
     False otherwise.
 
@@ -32,12 +218,17 @@ def validator(pattern: str, extract: bool = False) -> callable:
     >>> is_number('abc')
     False
     """
+    full, body = re.compile(pattern), re.compile(_strip_anchors(pattern))
 
     def decorator(func: callable) -> callable:
+        @functools.wraps(func)
         def wrapper(text: str) -> Union[bool, str]:
-            pattern_ = pattern[1:-1] if extract else pattern
-            match = re.search(pattern_, text)
-            return match.group() if extract and match else bool(match)
+            match = (body if extract else full).search(text)
+            if match is None:
+                return False
+            if extract:
+                return match.group() if func(match.group()) else False
+            return bool(func(text))
         return wrapper
     return decorator
 
@@ -48,7 +239,8 @@ def make_validator(pattern: str) -> callable:
     returns a function that checks if the given pattern matches
     the input string. If `extract` is True, the function returns
     the matching text, otherwise it returns True if there is a match,
-    False otherwise.
+    False otherwise. The pattern is compiled once, when the
+    validator is made.
 
     Args:
     - pattern (str): A regular expression pattern
@@ -64,14 +256,118 @@ def make_validator(pattern: str) -> callable:
     >>> is_alpha('123')
     False
     """
+    full, body = re.compile(pattern), re.compile(_strip_anchors(pattern))
 
     def validator(text: str, extract: bool = False) -> Union[bool, str]:
-        pattern_ = pattern[1:-1] if extract else pattern
-        match = re.search(pattern_, text)
+        match = (body if extract else full).search(text)
         return match.group() if extract and match else bool(match)
     return validator
 
 
+for _name, _pattern in PATTERNS.items():
+    register_pattern(_name, _pattern)
+# postal codes with two repeated pairs of alternating digits are rejected
+register_pattern('postal_code', PATTERNS['postal_code'],
+                 lambda code: len(_REPEATED_PAIR.findall(code)) < 2)
+
+
+def _classifier(types: Optional[Iterable[str]]
+                ) -> Callable[[str], Set[str]]:
+    """
+    Returns the function that classifies a value as the given types,
+    built once per set of types. The patterns a value can match are
+    picked by its first character, cached per character, and then
+    by its length and the characters it must contain.
+    """
+    types = tuple(TYPES) if types is None else tuple(types)
+    unknown = [t for t in types if t not in TYPES]
+    if unknown:
+        raise ValueError(f'unknown types {", ".join(map(repr, unknown))}, '
+                         f'expected some of {", ".join(TYPES)}')
+    key = tuple((t, TYPES[t]) for t in types)
+    classifier = _CLASSIFIERS.get(key)
+    if classifier is not None:
+        return classifier
+
+    candidates = []
+    for type_, names in key:
+        for name in names:
+            pattern, check = _lookup(name)
+            first, low, high, required = _PREFILTERS.get(
+                name, (None, 0, None, None))
+            candidates.append((first, type_, pattern.fullmatch, check,
+                               low, high, required))
+    by_first: Dict[str, list] = {}
+
+    def classify_value(value: str) -> Set[str]:
+        found = set()
+        if not value:
+            return found
+        start = value[0]
+        checks = by_first.get(start)
+        if checks is None:
+            checks = by_first[start] = [
+                c[1:] for c in candidates
+                if c[0] is None or c[0].match(start)]
+        length = len(value)
+        for type_, fullmatch, check, low, high, required in checks:
+            if type_ in found or length < low \
+                    or (high is not None and length > high) \
+                    or (required is not None and required not in value):
+                continue
+            if fullmatch(value) is not None \
+                    and (check is None or check(value)):
+                found.add(type_)
+        return found
+
+    _CLASSIFIERS[key] = classify_value
+    return classify_value
+
+
+def classify(value: str, types: Optional[Iterable[str]] = None) -> Set[str]:
+    """
+    Finds every type a string is valid as, in one pass over the
+    patterns that can match it. A pattern only runs when the first
+    character and the length of the string allow a match.
+
+    Args:
+        value (str): The string to be classified.
+        types (iterable): The types to look for, keys of `TYPES`
+            (default: all of them).
+
+    Returns:
+        set: The names of the matching types, empty if none match.
+
+    Examples:
+    >>> sorted(classify('10.0.0.1'))
+    ['ip', 'url']
+    >>> classify('jo@mail.com', types=['email', 'phone'])
+    {'email'}
+    """
+    return _classifier(types)(value)
+
+
+def classify_many(values: Iterable[str],
+                  types: Optional[Iterable[str]] = None) -> List[Set[str]]:
+    """
+    Classifies every string of an iterable, see `classify`.
+
+    Args:
+        values (iterable): The strings to be classified.
+        types (iterable): The types to look for, keys of `TYPES`
+            (default: all of them).
+
+    Returns:
+        list: The set of matching types of each value.
+
+    Examples:
+    >>> classify_many(['+14155552671', 'jo@mail.com'])
+    [{'phone'}, {'email'}]
+    """
+    classify_value = _classifier(types)
+    return [classify_value(value) for value in values]
+
+
 def is_alpha(string: str, extract: bool = False
              ) -> Union[bool, str]:
     """
@@ -95,9 +391,7 @@ def is_alpha(string: str, extract: bool = False
     >>> is_alpha('123')
     False
     """
-
-    pattern = r'^[a-zA-Z]+$'
-    return make_validator(pattern)(string, extract)
+    return validate('alpha', string, extract)
 
 
 def is_numeric(string: str, extract: bool = False) -> Union[bool, str]:
@@ -116,13 +410,7 @@ def is_numeric(string: str, extract: bool = False) -> Union[bool, str]:
             will be returned. Otherwise, False will be returned.
 
     """
-    pattern = r'^-?\d*\.?\d+$'
-    if extract:
-        pattern = pattern[1:-1]
-    match = re.search(pattern, string)
-    if extract and match:
-        return match.group()
-    return bool(match)
+    return validate('numeric', string, extract)
 
 
 def is_alphanumeric(string: str, extract: bool = False
@@ -142,13 +430,7 @@ def is_alphanumeric(string: str, extract: bool = False
             True will be returned. Otherwise, False will be returned.
 
     """
-    pattern = r'^[a-zA-Z0-9]+$'
-    if extract:
-        pattern = pattern[1:-1]
-    match = re.search(pattern, string)
-    if extract and match:
-        return match.group()
-    return bool(match)
+    return validate('alphanumeric', string, extract)
 
 
 def is_valid_email(email: str, extract: bool = False
@@ -168,13 +450,7 @@ def is_valid_email(email: str, extract: bool = False
             True will be returned. Otherwise, False will be returned.
 
     """
-    pattern = r'^\w+([\.-]?\w+)*@\w+([\.-]?\w+)*(\.\w{2,3})+$'
-    if extract:
-        pattern = pattern[1:-1]
-    match = re.search(pattern, email)
-    if extract and match:
-        return match.group()
-    return bool(match)
+    return validate('email', email, extract)
 
 
 def is_valid_url(url: str, extract: bool = False
@@ -194,13 +470,7 @@ def is_valid_url(url: str, extract: bool = False
     - If extract is False, returns a boolean value
         indicating whether the given URL is valid or not.
     """
-    pattern = r'^(https?://)?(?:[-\w.]|(?:%[\da-fA-F]{2}))+/?[\w.-]*$'
-    if extract:
-        pattern = pattern[1:-1]
-    match = re.search(pattern, url)
-    if extract and match:
-        return match.group()
-    return bool(match)
+    return validate('url', url, extract)
 
 
 def is_valid_phone_number_e164(
@@ -220,13 +490,7 @@ def is_valid_phone_number_e164(
     - If extract is False, returns a boolean value indicating
         whether the given phone number is valid or not.
     """
-    pattern = r'^\+[1-9]\d{8,14}$'
-    if extract:
-        pattern = pattern[1:-1]
-    match = re.search(pattern, phone_number)
-    if extract and match:
-        return match.group()
-    return bool(match)
+    return validate('phone_number_e164', phone_number, extract)
 
 
 def is_valid_postal_code(postal_code: str,
@@ -246,15 +510,7 @@ def is_valid_postal_code(postal_code: str,
     - If extract is False, returns a boolean value indicating whether the given
       postal code is valid or not.
     """
-    pattern_range = r'^[1-9]\d{5}$'
-    pattern_pair = r'(\d)(?=\d\1)'
-    if extract:
-        pattern_range = pattern_range[1:-1]
-    match_range = re.search(pattern_range, str(postal_code))
-    match_pair = len(re.findall(pattern_pair, str(postal_code))) < 2
-    if extract and match_range and match_pair:
-        return match_range.group()
-    return bool(match_range and match_pair)
+    return validate('postal_code', str(postal_code), extract)
 
 
 def is_valid_date(date_string: str,
@@ -270,13 +526,7 @@ def is_valid_date(date_string: str,
             else returns a boolean indicating whether the given string
             is a valid date in the format 'YYYY-MM-DD'.
     """
-    pattern = r'^\d{4}-\d{2}-\d{2}$'
-    if extract:
-        pattern = pattern[1:-1]
-    match = re.search(pattern, date_string)
-    if extract and match:
-        return match.group()
-    return bool(match)
+    return validate('date', date_string, extract)
 
 
 def is_valid_time(time_string: str, extract: bool = False) -> Union[bool, str]:
@@ -293,13 +543,7 @@ def is_valid_time(time_string: str, extract: bool = False) -> Union[bool, str]:
         the string is a valid time, returns the matched time string.
         Otherwise, returns False.
     """
-    pattern = r'^\d{2}:\d{2}:\d{2}$'
-    if extract:
-        pattern = pattern[1:-1]
-    match = re.search(pattern, time_string)
-    if extract and match:
-        return match.group()
-    return bool(match)
+    return validate('time', time_string, extract)
 
 
 def is_valid_datetime(datetime_string: str,
@@ -318,13 +562,7 @@ def is_valid_datetime(datetime_string: str,
         the string is a valid datetime, returns the matched datetime string.
         Otherwise, returns False.
     """
-    pattern = r'^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}$'
-    if extract:
-        pattern = pattern[1:-1]
-    match = re.search(pattern, datetime_string)
-    if extract and match:
-        return match.group()
-    return bool(match)
+    return validate('datetime', datetime_string, extract)
 
 
 def is_valid_ipv4(ip_string: str, extract: bool = False) -> Union[bool, str]:
@@ -341,13 +579,7 @@ def is_valid_ipv4(ip_string: str, extract: bool = False) -> Union[bool, str]:
         the string is a valid IP address, returns the matched IP string.
         Otherwise, returns False.
     """
-    pattern = r'^(?:(?:1?\d{1,2}|2[0-4]\d|25[0-5])\.){3}(?:1?\d{1,2}|2[0-4]\d|25[0-5])$'
-    if extract:
-        pattern = pattern[1:-1]
-    match = re.search(pattern, ip_string)
-    if extract and match:
-        return match.group()
-    return bool(match)
+    return validate('ipv4', ip_string, extract)
 
 
 def is_valid_ipv6(ip_string: str, extract: bool = False) -> Union[bool, str]:
@@ -364,14 +596,7 @@ def is_valid_ipv6(ip_string: str, extract: bool = False) -> Union[bool, str]:
         the string is a valid IP address, returns the matched IP string.
         Otherwise, returns False.
     """
-    pattern = r'''^(([0-9a-fA-F]{1,4}:){7,7}[0-9a-fA-F]{1,4}|([0-9a-fA-F]{1,4}:){1,7}:|([0-9a-fA-F]{1,4}:){1,6}:[0-9a-fA-F]{1,4}|([0-9a-fA-F]{1,4}:){1,5}(:[0-9a-fA-F]{1,4}){1,2}|([0-9a-fA-F]{1,4}:){1,4}(:[0-9a-fA-F]{1,4}){1,3}|([0-9a-fA-F]{1,4}:){1,3}(:[0-9a-fA-F]{1,4}){1,4}|([0-9a-fA-F]{1,4}:){1,2}(:[0-9a-fA-F]{1,4}){1,5}|[0-9a-fA-F]{1,4}:((:[0-9a-fA-F]{1,4}){1,6})|:((:[0-9a-fA-F]{1,4}){1,7}|:)|fe80:(:[0-9a-fA-F]{0,4}){0,4}%[0-9a-zA-Z]{1,}|::(ffff(:0{1,4}){0,1}:){0,1}((25[0-5]|(2[0-4]|1{0,1}[0-9]){0,1}[0-9])\.){3,3}(25[0-5]|(2[0-4]|1{0,1}[0-9]){0,1}[0-9])|([0-9a-fA-F]{1,4}:){1,4}:((25[0-5]|(2[0-4]|1{0,1}[0-9]){0,1}[0-9])\.){3,3}(25[0-5]|(2[0-4]|1{0,1}[0-9]){0,1}[0-9]))$'''
-
-    if extract:
-        pattern = pattern[1:-1]
-    match = re.search(pattern, ip_string)
-    if extract and match:
-        return match.group()
-    return bool(match)
+    return validate('ipv6', ip_string, extract)
 
 
 def is_valid_coordinate(coordinates: str,
@@ -389,14 +614,210 @@ def is_valid_coordinate(coordinates: str,
         the string is a valid IP address, returns the matched coordinates.
         Otherwise, returns False.
     """
-    pattern = r'''^\(\s*([+-]?(90(\.0+)?|[1-8]?[0-9](\.[0-9]+)?))\s*,\s*([+-]?(180(\.0+)?|1[0-7][0-9](\.[0-9]+)?|[1-9]?[0-9](\.[0-9]+)?))\s*\)$'''
+    return validate('coordinate', coordinates, extract)
+
+
+# Patterns that find values inside free text, used by the extractors.
+# They are bounded by the characters around the value instead of ^ and
+# $, can only start at the beginning of a token and look ahead for
+# the @ or : that emails and IPv6 addresses need before running, so a
+# scan stays linear in the size of the text.
+EXTRACT_PATTERNS = {
+    'email': r'(?<![\w.+-])(?=[\w.+-]*@)[\w.+-]+@[\w-]+(?:\.[\w-]+)*'
+             r'\.[A-Za-z]{2,}(?![\w-])',
+    'url': r'(?<![\w/])(?:https?://|www\.)'
+           r'[^\s<>"\'`]*[^\s<>"\'`.,;:!?)\]}]',
+    'ipv6': r'(?<![\w:.])(?=[0-9a-fA-F]{0,4}:)(?:'
+            + _strip_anchors(PATTERNS['ipv6']) + r')(?![\w:%]|\.\d)',
+    'ipv4': r'(?<![\w:.])(?:(?:25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)\.){3}'
+            r'(?:25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)(?!\w|\.\d)',
+}
+
+# Smallest overlap the chunked extractors accept, room for the longest
+# IPv6 address (45 characters) and for common emails and URLs
+MIN_OVERLAP = 64
+
+# ((type, pattern)..., bytes) -> one alternation with a named group
+# per type
+_EXTRACTORS: Dict[tuple, re.Pattern] = {}
+
+
+def _extractor(types: Optional[Iterable[str]], binary: bool) -> re.Pattern:
+    types = tuple(EXTRACT_PATTERNS) if types is None else tuple(types)
+    unknown = [t for t in types if t not in EXTRACT_PATTERNS]
+    if unknown:
+        raise ValueError(f'unknown types {", ".join(map(repr, unknown))}, '
+                         f'expected some of {", ".join(EXTRACT_PATTERNS)}')
+    key = (tuple((t, EXTRACT_PATTERNS[t]) for t in types), binary)
+    pattern = _EXTRACTORS.get(key)
+    if pattern is None:
+        # matches never overlap, the first type listed wins a tie. No
+        # value starts after a word character, testing that once up
+        # front saves trying every type inside words.
+        source = r'(?<!\w)(?:' + '|'.join(
+            f'(?P<{t}>{EXTRACT_PATTERNS[t]})' for t in types) + ')'
+        pattern = _EXTRACTORS[key] = re.compile(
+            source.encode() if binary else source, re.ASCII)
+    return pattern
+
+
+def _check_window(chunk_size: int, overlap: int) -> None:
+    if chunk_size < 1:
+        raise ValueError(f'chunk_size must be at least 1, got {chunk_size}')
+    if overlap < MIN_OVERLAP:
+        raise ValueError(f'overlap must be at least {MIN_OVERLAP} so values '
+                         f'split between chunks are found, got {overlap}')
+
+
+def _value(match: re.Match) -> str:
+    value = match.group()
+    return value if isinstance(value, str) \
+        else value.decode('utf-8', 'replace')
+
+
+def _scan(pattern: re.Pattern, text: Union[str, bytes, mmap.mmap],
+          start: int, end: int, overlap: int, final: bool, base: int = 0
+          ) -> Iterator[Tuple[str, str, int]]:
+    """
+    Yields the matches in a window `text[start:end]`. Unless the
+    window is the last one, matches that start in its last `overlap`
+    characters are left for the next window, since they may go on
+    past `end`.
+    :return: The position the next window is searched from
+    """
+    limit = end if final else end - overlap
+    resume = max(limit, start)
+    for match in pattern.finditer(text, start, end):
+        if not final and match.start() >= limit:
+            return match.start()
+        yield match.lastgroup, _value(match), base + match.start()
+        resume = max(resume, match.end())
+    return resume
+
+
+def extract_all(text: Union[str, bytes],
+                types: Optional[Iterable[str]] = None
+                ) -> Iterator[Tuple[str, str, int]]:
+    """
+    Finds every email, URL and IP address in a string, unlike
+    `extract=True` in the validators, which returns the first one.
+
+    Args:
+        text (str or bytes): The text to be searched.
+        types (iterable): The types to look for, keys of
+            `EXTRACT_PATTERNS` (default: all of them).
+
+    Yields:
+        tuple: (type, value, offset) for every match, in order.
+
+    Examples:
+    >>> list(extract_all('jo@mail.com from 10.0.0.1'))
+    [('email', 'jo@mail.com', 0), ('ipv4', '10.0.0.1', 17)]
+    """
+    pattern = _extractor(types, isinstance(text, bytes))
+    return _scan(pattern, text, 0, len(text), 0, True)
+
+
+def extract_stream(stream: IO, types: Optional[Iterable[str]] = None,
+                   chunk_size: int = 1 << 20, overlap: int = 8192
+                   ) -> Iterator[Tuple[str, str, int]]:
+    """
+    Finds every email, URL and IP address in a file object, read in
+    chunks, so memory stays at about `chunk_size + overlap` whatever
+    the size of the stream. The last `overlap` characters of a chunk
+    are searched again with the next one, so a value split between
+    two reads is found whole. Values longer than `overlap` can be
+    cut at a chunk boundary.
 
-    if extract:
-        pattern = pattern[1:-1]
-    match = re.search(pattern, coordinates)
-    if extract and match:
-        return match.group()
-    return bool(match)
+    Args:
+        stream (file): A file object opened in binary or text mode,
+            e.g. `sys.stdin.buffer` or `gzip.open(path)`.
+        types (iterable): The types to look for, keys of
+            `EXTRACT_PATTERNS` (default: all of them).
+        chunk_size (int): Characters read at a time.
+        overlap (int): Longest value found reliably across reads, at
+            least `MIN_OVERLAP`.
+
+    Yields:
+        tuple: (type, value, offset) for every match, in order. The
+        offset counts bytes for binary streams and characters for
+        text streams.
+
+    Raises:
+        ValueError: If `chunk_size` is below 1 or `overlap` below
+            `MIN_OVERLAP`.
+    """
+    _check_window(chunk_size, overlap)
+    chunk = stream.read(chunk_size)
+    pattern = _extractor(types, isinstance(chunk, bytes))
+    buffer, base, start = chunk, 0, 0
+    while True:
+        final = not chunk
+        resume = yield from _scan(pattern, buffer, start, len(buffer),
+                                  overlap, final, base)
+        if final:
+            return
+        # keep one character before the resume point for the lookbehinds
+        keep = max(resume - 1, 0)
+        base += keep
+        start = resume - keep
+        chunk = stream.read(chunk_size)
+        buffer = buffer[keep:] + chunk
+
+
+def extract_file(path: str, types: Optional[Iterable[str]] = None,
+                 chunk_size: int = 1 << 20, overlap: int = 8192
+                 ) -> Iterator[Tuple[str, str, int]]:
+    """
+    Finds every email, URL and IP address in a file of any size.
+    The file is memory-mapped and searched in place, one window of
+    `chunk_size` bytes at a time, with windows that overlap like the
+    chunks of `extract_stream`. The pages of each searched window are
+    released, so memory does not grow with the file. Files that cannot
+    be mapped (pipes, special files) are read with `extract_stream`.
+
+    Args:
+        path (str): The path of the file.
+        types (iterable): The types to look for, keys of
+            `EXTRACT_PATTERNS` (default: all of them).
+        chunk_size (int): Bytes searched, or read, at a time.
+        overlap (int): Longest value found reliably across windows,
+            at least `MIN_OVERLAP`.
+
+    Yields:
+        tuple: (type, value, byte offset) for every match, in order.
+        Values are decoded as UTF-8.
+
+    Raises:
+        ValueError: If `chunk_size` is below 1 or `overlap` below
+            `MIN_OVERLAP`.
+    """
+    _check_window(chunk_size, overlap)
+    pattern = _extractor(types, True)
+    with open(path, 'rb') as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # empty files cannot be mapped either
+            if os.path.isfile(path) and os.path.getsize(path) == 0:
+                return
+            yield from extract_stream(f, types, chunk_size, overlap)
+            return
+        with mapped:
+            if hasattr(mapped, 'madvise'):
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+            size, start = len(mapped), 0
+            while True:
+                end = min(start + chunk_size + overlap, size)
+                start = yield from _scan(pattern, mapped, start, end,
+                                         overlap, end == size)
+                if end == size:
+                    return
+                # drop the searched pages, keeping the one the
+                # lookbehinds of the next window read
+                searched = (start - 1) // mmap.PAGESIZE * mmap.PAGESIZE
+                if searched and hasattr(mmap, 'MADV_DONTNEED'):
+                    mapped.madvise(mmap.MADV_DONTNEED, 0, searched)
 
 
 def remove_symbols(x: str) -> str:
@@ -407,6 +828,7 @@ def remove_symbols(x: str) -> str:
     :return: The input string with symbols removed
     :rtype: str
     """
+    from unidecode import unidecode
     x = unidecode(x) if x else ''
     return re.sub(r'[^\w ]', '', x)
 
@@ -435,8 +857,3 @@ def separate_numbers_letters(x: str) -> str:
     return ' '.join(re.findall(
         '[0-9]+|[a-zA-Z]+', x))
 
-
-file_name = os.path.splitext(os.path.basename(os.path.abspath(__file__)))[0]
-dir_name = os.path.basename(os.path.dirname(os.path.abspath(__file__)))
-if __name__ == "__main__" or __name__ == f"{dir_name}.{file_name}":
-    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -0,0 +1,35 @@
+"""
+A module for automating web browsers with Selenium.
+
+The functions are loaded lazily on first access (PEP 562), so importing
+the package does not import `selenium_utils.selenium_utils` or its dependencies until one
+of them is used.
+"""
+import importlib
+
+_SUBMODULES = {
+    'selenium_utils': (
+        'getDriver', 'driver_wait', 'click_element', 'type_or_get_text',
+        'page_interaction', 'find_element_data', 'cookie_manager',
+    ),
+}
+_LAZY = {name: module for module, names in _SUBMODULES.items()
+         for name in names}
+
+__all__ = list(_LAZY)
+
+
+def __getattr__(name: str):
+    if name in _SUBMODULES:
+        return importlib.import_module(f'{__name__}.{name}')
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(
+            f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(f'{__name__}.{module}'), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY) | set(_SUBMODULES))
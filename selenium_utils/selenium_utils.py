@@ -1,23 +1,16 @@
-import os
-import sys
-import pickle
-
-import selenium
+from __future__ import annotations
 
-from selenium import webdriver
-from fake_useragent import UserAgent
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.remote.webdriver import WebDriver
-from selenium.webdriver.common.desired_capabilities import DesiredCapabilities
+import pickle
 
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from typing import Union, Dict, List, TYPE_CHECKING
 
-from utils.ip_utils import useful_proxies_gen
+# selenium, fake_useragent and the proxy helpers are imported inside
+# the functions that use them so importing this module stays cheap
+if TYPE_CHECKING:
+    import selenium
 
-from typing import Union, Dict, List
+    from selenium import webdriver
+    from selenium.webdriver.remote.webdriver import WebDriver
 
 
 def getDriver(*mods: str) -> webdriver.Chrome:
@@ -36,6 +29,7 @@ def getDriver(*mods: str) -> webdriver.Chrome:
     :return: webdriver with the *mods specified.
     :rtype: webdriver.Chrome
     """
+    from selenium import webdriver
     chrome_options = webdriver.ChromeOptions()
     # capabilities = DesiredCapabilities.CHROME
 
@@ -48,6 +42,7 @@ def getDriver(*mods: str) -> webdriver.Chrome:
     chrome_options.add_argument("--disable-notifications")
 
     if 'userAgent' in mods:
+        from fake_useragent import UserAgent
         chrome_options.add_argument(
             f"user-agent={UserAgent().random}")
     if 'incognito' in mods:
@@ -55,6 +50,7 @@ def getDriver(*mods: str) -> webdriver.Chrome:
     if 'proxy' in mods:
         proxy_ = [x.split('=')[-1] for x in mods if 'proxy=' in x]
         if not proxy_:
+            from ip_utils.ip_utils import useful_proxies_gen
             proxy_ = next(useful_proxies_gen(type_='data'))
         else:
             proxy_ = proxy_[0]
@@ -86,6 +82,9 @@ def driver_wait(driver: WebDriver, time: int,
     :return: True after the element has been found.
     :rtype: Union[None, bool]
     """
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
     try:
         WebDriverWait(driver, time).until(
             EC.element_to_be_clickable((By.XPATH, xpath))
@@ -112,6 +111,7 @@ def click_element(driver: WebDriver,
     :return: True after the element has been clicked.
     :rtype: bool
     """
+    from selenium.webdriver.common.by import By
     driver_wait(driver, time, xpath)
     driver.find_element(By.XPATH, xpath).click()
     return True
@@ -134,6 +134,8 @@ def type_or_get_text(driver: WebDriver, time: int,
     :param action: Action to do. One of: 'type', 'get' and 'return'
     :type action: str
     """
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.common.keys import Keys
     driver_wait(driver, time, xpath)
     element = driver.find_element(By.XPATH, xpath)
     if action == 'type':
@@ -228,6 +230,7 @@ def find_element_data(driver: WebDriver, contains_text: Union[str, List[str]] =
         If `return_xpath` is True and only one element is found,
             the XPath string is returned.
     """
+    from selenium.webdriver.common.by import By
     tags = [contains_text, contains_class, contains_id, contains_src,
             contains_style, contains_name, contains_title, contains_alt,
             contains_href]
@@ -281,8 +284,3 @@ def cookie_manager(driver: WebDriver, path: str = 'cookies.pkl',
         for cookie in cookies:
             driver.add_cookie(cookie)
 
-
-file_name = os.path.splitext(os.path.basename(os.path.abspath(__file__)))[0]
-dir_name = os.path.basename(os.path.dirname(os.path.abspath(__file__)))
-if __name__ == "__main__" or __name__ == f"{dir_name}.{file_name}":
-    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
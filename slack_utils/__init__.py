@@ -0,0 +1,34 @@
+"""
+A module for sending messages to Slack.
+
+The functions are loaded lazily on first access (PEP 562), so importing
+the package does not import `slack_utils.slack_utils` or its dependencies until one
+of them is used.
+"""
+import importlib
+
+_SUBMODULES = {
+    'slack_utils': (
+        'slackMessage', 'send_message',
+    ),
+}
+_LAZY = {name: module for module, names in _SUBMODULES.items()
+         for name in names}
+
+__all__ = list(_LAZY)
+
+
+def __getattr__(name: str):
+    if name in _SUBMODULES:
+        return importlib.import_module(f'{__name__}.{name}')
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(
+            f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(f'{__name__}.{module}'), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY) | set(_SUBMODULES))
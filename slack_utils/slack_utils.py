@@ -1,7 +1,5 @@
-import os
 import sys
 import json
-import requests
 
 from typing import Dict, Union
 
@@ -43,6 +41,7 @@ def slackMessage(message: Union[str, Dict], url: str,
             }
         ]
     }
+    import requests
     byte_length = str(sys.getsizeof(slack_data))
     headers = {'Content-Type': "application/json",
                'Content-Length': byte_length}
@@ -80,6 +79,7 @@ create-slack-bot-using-python-tutorial-with-examples/
     """
     if not TOKEN:
         return "Error: No Slack token provided."
+    import requests
     url = "https://slack.com/api/chat.postMessage"
     headers = {
         "Content-type": "application/json",
@@ -97,8 +97,3 @@ create-slack-bot-using-python-tutorial-with-examples/
     response = requests.post(url=url, headers=headers, json=json)
     return response.text
 
-
-file_name = os.path.splitext(os.path.basename(os.path.abspath(__file__)))[0]
-dir_name = os.path.basename(os.path.dirname(os.path.abspath(__file__)))
-if __name__ == "__main__" or __name__ == f"{dir_name}.{file_name}":
-    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
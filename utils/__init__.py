@@ -0,0 +1,44 @@
+"""
+A module with various decorators and everyday functions.
+
+The functions are loaded lazily on first access (PEP 562), so importing
+the package does not import `utils.utils` or its dependencies until one
+of them is used.
+"""
+import importlib
+
+_SUBMODULES = {
+    'utils': (
+        'retry_decorator', 'timed_retries', 'exit_after',
+        'execution_time', 'remove_duplicates', 'RateLimitExceeded',
+        'TokenBucket', 'RateLimiter', 'rate_limit', 'HedgePolicy',
+        'hedged', 'levenshtein', 'category_mapper', 'find_rank',
+        'check_value', 'int_safe_cast', 'float_safe_cast',
+        'word_replacer', 'combination_powerset', 'powerset',
+        'odd_ones_out', 'big_bang_substring',
+        'big_bang_substring_detail', 'numbers_to_words', 'is_leap_year',
+        'make_trie', 'in_trie_bool', 'insert_trie', 'trie_starts_with',
+        'count_words_trie', 'remove_trie', 'get_trie_words',
+        'autocomplete_trie',
+    ),
+}
+_LAZY = {name: module for module, names in _SUBMODULES.items()
+         for name in names}
+
+__all__ = list(_LAZY)
+
+
+def __getattr__(name: str):
+    if name in _SUBMODULES:
+        return importlib.import_module(f'{__name__}.{name}')
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(
+            f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(f'{__name__}.{module}'), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY) | set(_SUBMODULES))
@@ -9,10 +9,18 @@ import _thread as thread
 
 from math import factorial
 from functools import wraps
+from collections import deque, OrderedDict
 from datetime import datetime
 from itertools import chain, combinations
 
-from typing import Callable, List, Tuple, Union, Dict
+from typing import (Callable, List, Tuple, Union, Dict, Hashable,
+                    Optional, TYPE_CHECKING)
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+NUMBERS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            'numbers.json')
 
 # Decorators
 
@@ -167,6 +175,521 @@ def remove_duplicates(f: Callable) -> Callable:
         return f(*args)
     return func_no_duplicates
 
+
+class RateLimitExceeded(Exception):
+    """
+    Raised by a rate limiter when the bucket is empty and
+    the caller asked not to block (or to block for less
+    time than the next token needs to arrive)
+    """
+
+
+class TokenBucket:
+    """
+    A thread-safe token bucket that refills at `rate` tokens
+    per second up to `capacity` tokens (the burst size).
+
+    Blocking callers reserve their tokens up front and sleep
+    for the deficit, so waiters are served in arrival order
+    without polling. It can be used directly as a sync or
+    async context manager that takes one token.
+
+    :param rate: Tokens added to the bucket per second
+    :type rate: float
+    :param capacity: Maximum number of tokens in the bucket
+    :type capacity: float
+    :param block: If False, raise RateLimitExceeded instead
+        of waiting when the bucket is empty
+    :type block: bool
+    :param timeout: Maximum seconds to wait for a token,
+        None waits as long as needed
+    :type timeout: float
+    """
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated',
+                 'block', 'timeout', 'lock')
+
+    def __init__(self, rate: float, capacity: float,
+                 block: bool = True,
+                 timeout: Optional[float] = None):
+        if rate <= 0 or capacity <= 0:
+            raise ValueError('rate and capacity must be positive')
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.block = block
+        self.timeout = timeout
+        self.lock = threading.Lock()
+
+    def reserve(self, tokens: float = 1,
+                block: Optional[bool] = None,
+                timeout: Optional[float] = None) -> float:
+        """
+        Takes tokens from the bucket and returns the number of
+        seconds the caller has to wait before using them
+
+        :param tokens: Number of tokens to take
+        :type tokens: float
+        :param block: Overrides the bucket's block setting
+        :type block: bool
+        :param timeout: Overrides the bucket's timeout setting
+        :type timeout: float
+        :raises RateLimitExceeded: If the tokens are not available
+            and the caller can not wait for them
+        :return: Seconds to wait, 0.0 if the tokens are available
+        :rtype: float
+        """
+        block = self.block if block is None else block
+        timeout = self.timeout if timeout is None else timeout
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens +
+                              (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return 0.0
+            wait = (tokens - self.tokens) / self.rate
+            if not block or (timeout is not None and wait > timeout):
+                raise RateLimitExceeded(
+                    f'rate limit exceeded, next token in {wait:.3f}s')
+            # the debt is paid back by the refill while the caller sleeps
+            self.tokens -= tokens
+            return wait
+
+    def acquire(self, tokens: float = 1,
+                block: Optional[bool] = None,
+                timeout: Optional[float] = None) -> float:
+        """
+        Takes tokens from the bucket, sleeping the current
+        thread until they are available
+
+        :param tokens: Number of tokens to take
+        :type tokens: float
+        :return: Seconds spent waiting
+        :rtype: float
+        """
+        wait = self.reserve(tokens, block, timeout)
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens: float = 1,
+                            block: Optional[bool] = None,
+                            timeout: Optional[float] = None) -> float:
+        """
+        Takes tokens from the bucket, suspending the current
+        coroutine (not the event loop) until they are available
+
+        :param tokens: Number of tokens to take
+        :type tokens: float
+        :return: Seconds spent waiting
+        :rtype: float
+        """
+        wait = self.reserve(tokens, block, timeout)
+        if wait:
+            import asyncio
+            await asyncio.sleep(wait)
+        return wait
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    async def __aenter__(self):
+        await self.acquire_async()
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class RateLimiter:
+    """
+    A collection of token buckets, one per key, used as a
+    decorator or as a context manager. Built by `rate_limit`.
+
+    :param rate: Calls allowed per `per` seconds
+    :type rate: float
+    :param per: Length of the rate period in seconds
+    :type per: float
+    :param burst: Bucket capacity, defaults to `rate` (at least 1)
+    :type burst: float
+    :param block: If False, raise RateLimitExceeded instead
+        of waiting when the bucket is empty
+    :type block: bool
+    :param timeout: Maximum seconds to wait for a token
+    :type timeout: float
+    :param key: A function that receives the decorated function's
+        arguments and returns the bucket key (e.g. the host)
+    :type key: Callable
+    :param max_keys: Per-key buckets kept, the least recently
+        used is dropped beyond that
+    :type max_keys: int
+    """
+
+    def __init__(self, rate: float, per: float = 1.0,
+                 burst: Optional[float] = None, block: bool = True,
+                 timeout: Optional[float] = None,
+                 key: Optional[Callable[..., Hashable]] = None,
+                 max_keys: int = 10000):
+        if per <= 0:
+            raise ValueError('per must be positive')
+        self.rate = rate / per
+        self.burst = burst if burst is not None else max(rate, 1)
+        self.block = block
+        self.timeout = timeout
+        self.key = key
+        self.max_keys = max_keys
+        # least recently used first, the shared None bucket is kept
+        self.buckets: 'OrderedDict[Hashable, TokenBucket]' = OrderedDict(
+            {None: self._new_bucket()})
+        self.lock = threading.Lock()
+
+    def _new_bucket(self) -> TokenBucket:
+        return TokenBucket(self.rate, self.burst,
+                           self.block, self.timeout)
+
+    def bucket(self, key: Hashable = None) -> TokenBucket:
+        """
+        Returns the token bucket for the given key,
+        creating it on first use. Beyond `max_keys` keys the
+        least recently used bucket is dropped
+
+        use: with limiter.bucket('example.com'): ...
+
+        :param key: The bucket key, None for the shared bucket
+        :type key: Hashable
+        :return: The token bucket for the key
+        :rtype: TokenBucket
+        """
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is not None:
+                self.buckets.move_to_end(key)
+                return bucket
+            bucket = self.buckets[key] = self._new_bucket()
+            if len(self.buckets) > self.max_keys + 1:
+                oldest = next(k for k in self.buckets if k is not None)
+                del self.buckets[oldest]
+        return bucket
+
+    def __call__(self, f: Callable) -> Callable:
+        import asyncio
+        key = self.key
+        if asyncio.iscoroutinefunction(f):
+            @wraps(f)
+            async def async_rate_limited(*args, **kwargs):
+                bucket = self.bucket(
+                    key(*args, **kwargs) if key else None)
+                await bucket.acquire_async()
+                return await f(*args, **kwargs)
+            return async_rate_limited
+
+        @wraps(f)
+        def rate_limited(*args, **kwargs):
+            self.bucket(key(*args, **kwargs) if key else None).acquire()
+            return f(*args, **kwargs)
+        return rate_limited
+
+    def __enter__(self):
+        self.buckets[None].acquire()
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    async def __aenter__(self):
+        await self.buckets[None].acquire_async()
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+def rate_limit(rate: float, per: float = 1.0,
+               burst: Optional[float] = None, block: bool = True,
+               timeout: Optional[float] = None,
+               key: Optional[Callable[..., Hashable]] = None,
+               max_keys: int = 10000) -> RateLimiter:
+    """
+    A decorator and context manager that limits how often a
+    function is called using a token bucket. Up to `burst` calls
+    go through at once, after that calls are spaced to `rate`
+    per `per` seconds. Works with threads and with coroutine
+    functions (the event loop is never blocked).
+
+    use: @rate_limit(rate, per, burst)
+         @rate_limit(rate, key=lambda url, **kw: urlparse(url).netloc)
+         with limiter: ...  /  async with limiter: ...
+
+    :param rate: Calls allowed per `per` seconds
+    :type rate: float
+    :param per: Length of the rate period in seconds
+    :type per: float
+    :param burst: Maximum calls allowed at once, defaults to `rate`
+        (at least 1)
+    :type burst: float
+    :param block: If True, wait for a token, otherwise
+        raise RateLimitExceeded when the bucket is empty
+    :type block: bool
+    :param timeout: Maximum seconds to wait for a token before
+        raising RateLimitExceeded, None waits as long as needed
+    :type timeout: float
+    :param key: A function that receives the decorated function's
+        arguments and returns the key of the bucket to use,
+        so each key (e.g. each host) gets its own limit
+    :type key: Callable
+    :param max_keys: Per-key buckets kept, the least recently used
+        is dropped beyond that (its key starts again with a full
+        bucket)
+    :type max_keys: int
+    :return: A RateLimiter usable as decorator or context manager
+    :rtype: RateLimiter
+    """
+    return RateLimiter(rate, per, burst, block, timeout, key, max_keys)
+
+
+class HedgePolicy:
+    """
+    The state shared by every call of a `hedged` function:
+    the hedge delay (fixed or learned from a window of recent
+    latencies), the budget of extra calls and the win counters.
+
+    :param delay: Fixed hedge delay in seconds, None to learn it
+    :type delay: float
+    :param percentile: Latency percentile used as learned delay
+    :type percentile: float
+    :param initial_delay: Delay used until `min_samples`
+        latencies have been observed
+    :type initial_delay: float
+    :param max_hedge_ratio: Maximum hedges per call, e.g. 0.1
+        allows at most 10% extra load
+    :type max_hedge_ratio: float
+    :param window: Number of recent latencies kept
+    :type window: int
+    :param min_samples: Latencies needed before learning the delay
+    :type min_samples: int
+    """
+
+    def __init__(self, delay: Optional[float] = None,
+                 percentile: float = 95, initial_delay: float = 1.0,
+                 max_hedge_ratio: float = 0.1, window: int = 1000,
+                 min_samples: int = 20):
+        self.fixed_delay = delay
+        self.percentile = percentile
+        self.current_delay = delay if delay is not None else initial_delay
+        self.max_hedge_ratio = max_hedge_ratio
+        self.min_samples = min_samples
+        self.latencies = deque(maxlen=window)
+        self.new_samples = 0
+        self.calls = self.hedges = 0
+        self.primary_wins = self.hedge_wins = 0
+        self.lock = threading.Lock()
+
+    def delay(self) -> float:
+        """
+        Returns the seconds to wait before firing a hedge
+        :return: The hedge delay in seconds
+        :rtype: float
+        """
+        return self.current_delay
+
+    def observe(self, latency: float):
+        """
+        Records the latency of a successful attempt and refreshes
+        the learned delay every few samples
+        :param latency: The attempt latency in seconds
+        :type latency: float
+        """
+        with self.lock:
+            self.latencies.append(latency)
+            self.new_samples += 1
+            if (self.fixed_delay is not None
+                    or len(self.latencies) < self.min_samples
+                    or self.new_samples < 16):
+                return
+            self.new_samples = 0
+            ordered = sorted(self.latencies)
+            index = int(len(ordered) * self.percentile / 100)
+            self.current_delay = ordered[min(index, len(ordered) - 1)]
+
+    def start_call(self):
+        with self.lock:
+            self.calls += 1
+
+    def allow_hedge(self) -> bool:
+        """
+        Takes one hedge from the extra load budget
+        :return: True if a hedge can be fired
+        :rtype: bool
+        """
+        with self.lock:
+            # the hedge must fit the budget once fired, so none is
+            # fired before 1 / max_hedge_ratio calls
+            if self.hedges + 1 <= self.max_hedge_ratio * self.calls:
+                self.hedges += 1
+                return True
+            return False
+
+    def record_win(self, hedge: bool):
+        with self.lock:
+            if hedge:
+                self.hedge_wins += 1
+            else:
+                self.primary_wins += 1
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Returns the hedging counters
+        :return: calls, hedges fired, primary and hedge wins,
+            the hedge and hedge win rates and the current delay
+        :rtype: Dict[str, float]
+        """
+        with self.lock:
+            return {'calls': self.calls,
+                    'hedges': self.hedges,
+                    'primary_wins': self.primary_wins,
+                    'hedge_wins': self.hedge_wins,
+                    'hedge_rate': self.hedges / self.calls
+                    if self.calls else 0.0,
+                    'hedge_win_rate': self.hedge_wins / self.hedges
+                    if self.hedges else 0.0,
+                    'delay': self.current_delay}
+
+
+def hedged(delay: Optional[float] = None, percentile: float = 95,
+           initial_delay: float = 1.0, max_hedge_ratio: float = 0.1,
+           window: int = 1000, min_samples: int = 20,
+           executor: Optional['Executor'] = None,
+           max_workers: int = 256) -> Callable:
+    """
+    A decorator that cuts tail latency by hedging: if the call
+    has not returned after `delay` seconds (or the learned
+    `percentile` latency when delay is None) a duplicate call is
+    fired and whichever finishes first successfully is returned.
+    The loser is cancelled if it has not started yet, otherwise
+    its result is ignored. Only use it on idempotent functions.
+
+    Regular functions run in a thread pool, coroutine functions
+    run as asyncio tasks. The pool runs at most `max_workers`
+    attempts at once, callers beyond that wait for a thread, and the
+    hedge delay only starts once the primary attempt is running.
+    The decorated function exposes `hedge_stats()` to report how
+    often hedges won.
+
+    use: @hedged(delay)  /  @hedged(percentile=95)
+
+    :param delay: Fixed hedge delay in seconds, None to learn it
+    :type delay: float
+    :param percentile: Latency percentile used as learned delay
+    :type percentile: float
+    :param initial_delay: Delay used until enough latencies
+        have been observed
+    :type initial_delay: float
+    :param max_hedge_ratio: Maximum hedges per call, caps the
+        extra load (0.1 is at most 10% more calls)
+    :type max_hedge_ratio: float
+    :param window: Number of recent latencies kept
+    :type window: int
+    :param min_samples: Latencies needed before learning the delay
+    :type min_samples: int
+    :param executor: Executor for regular functions, defaults to
+        a thread pool owned by the decorated function
+    :type executor: Executor
+    :param max_workers: Threads of the default pool, the number of
+        concurrent callers it serves without queueing (hedges
+        included). Threads are only started when needed
+    :type max_workers: int
+    :return: The decorated function
+    :rtype: Callable
+    """
+    def hedged_(f: Callable) -> Callable:
+        import asyncio
+        from concurrent.futures import (ThreadPoolExecutor, FIRST_COMPLETED,
+                                        wait as futures_wait)
+        policy = HedgePolicy(delay, percentile, initial_delay,
+                             max_hedge_ratio, window, min_samples)
+
+        if asyncio.iscoroutinefunction(f):
+            async def attempt(*args, **kwargs):
+                start = time.monotonic()
+                result = await f(*args, **kwargs)
+                policy.observe(time.monotonic() - start)
+                return result
+
+            @wraps(f)
+            async def async_hedged(*args, **kwargs):
+                policy.start_call()
+                primary = asyncio.ensure_future(attempt(*args, **kwargs))
+                tasks = {primary: False}
+                try:
+                    done, _ = await asyncio.wait(
+                        {primary}, timeout=policy.delay())
+                    if not done and policy.allow_hedge():
+                        tasks[asyncio.ensure_future(
+                            attempt(*args, **kwargs))] = True
+                    pending, error = set(tasks), None
+                    while pending:
+                        done, pending = await asyncio.wait(
+                            pending, return_when=asyncio.FIRST_COMPLETED)
+                        for task in done:
+                            if task.exception() is None:
+                                policy.record_win(tasks[task])
+                                return task.result()
+                            error = task.exception()
+                    raise error
+                finally:
+                    for task in tasks:
+                        if not task.done():
+                            task.cancel()
+            async_hedged.hedge_stats = policy.stats
+            return async_hedged
+
+        pool = executor or ThreadPoolExecutor(
+            max_workers, thread_name_prefix=f'hedged-{f.__name__}')
+
+        def attempt(running, *args, **kwargs):
+            start = time.monotonic()
+            running.set()
+            result = f(*args, **kwargs)
+            policy.observe(time.monotonic() - start)
+            return result
+
+        @wraps(f)
+        def func_hedged(*args, **kwargs):
+            policy.start_call()
+            running = threading.Event()
+            primary = pool.submit(attempt, running, *args, **kwargs)
+            futures = {primary: False}
+            try:
+                # the delay counts from the start of the primary, time
+                # spent queued in the pool would only fire useless hedges
+                running.wait()
+                done, _ = futures_wait([primary], timeout=policy.delay())
+                if not done and policy.allow_hedge():
+                    futures[pool.submit(attempt, threading.Event(),
+                                        *args, **kwargs)] = True
+                pending, error = set(futures), None
+                while pending:
+                    done, pending = futures_wait(
+                        pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        if future.exception() is None:
+                            policy.record_win(futures[future])
+                            return future.result()
+                        error = future.exception()
+                raise error
+            finally:
+                for future in futures:
+                    future.cancel()
+        func_hedged.hedge_stats = policy.stats
+        return func_hedged
+    return hedged_
+
 # Functions
 
 
@@ -495,7 +1018,7 @@ def numbers_to_words(number: Union[str, int]) -> str:
     if length > 36:
         return 'This program supports a maximum of 36 digit numbers.'
 
-    with open('numbers.json', 'r') as f:
+    with open(NUMBERS_PATH, 'r') as f:
         numbers = json.load(f)
 
     def create_segment(number, index):
@@ -732,8 +1255,3 @@ def autocomplete_trie(trie: Dict[str, any], prefix: str) -> list:
             return []
     return [prefix + i for i in get_trie_words(current_dict)]
 
-
-file_name = os.path.splitext(os.path.basename(os.path.abspath(__file__)))[0]
-dir_name = os.path.basename(os.path.dirname(os.path.abspath(__file__)))
-if __name__ == "__main__" or __name__ == f"{dir_name}.{file_name}":
-    sys.path.append(os.path.dirname(os.path.abspath(__file__)))